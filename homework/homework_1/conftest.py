@@ -5,6 +5,7 @@ This file automatically configures pytest-django to work with the project.
 
 import os
 import django
+import pytest
 from django.conf import settings
 
 # Configure Django settings
@@ -13,3 +14,34 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
 # Setup Django
 if not settings.configured:
     django.setup()
+
+from django.core.cache import caches  # noqa: E402
+from todos import audit  # noqa: E402
+from todos.cache import stats as todo_cache_stats  # noqa: E402
+from todos.ratelimit import stats as rate_limit_stats  # noqa: E402
+from todos.taskqueue import stats as task_queue_stats  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def run_tasks_inline(settings):
+    """Run deferred side effects inside the test's transaction."""
+    settings.TASK_QUEUE_MODE = 'immediate'
+    yield
+    task_queue_stats.reset()
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Keep cached TODOs from leaking between tests (the DB is rolled back)."""
+    yield
+    for cache in caches.all():
+        cache.clear()
+    todo_cache_stats.reset()
+    rate_limit_stats.reset()
+
+
+@pytest.fixture(autouse=True)
+def audit_buffer(monkeypatch, settings):
+    """Give each test its own audit buffer that only flushes when asked to."""
+    settings.AUDIT_FLUSH_INTERVAL = 3600
+    monkeypatch.setattr(audit, 'buffer', audit.AuditBuffer())
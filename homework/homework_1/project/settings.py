@@ -30,11 +30,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'todos.profiling.SamplingProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'todos.assets.StaticAssetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'todos.ratelimit.RateLimitMiddleware',
+    'todos.audit.AuditMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -70,6 +74,63 @@ DATABASES = {
 }
 
 
+# Cache
+# TODO objects are cached per pk in their own LRU-bounded locmem cache
+# (see todos/cache.py); write rate-limit buckets in another (todos/ratelimit.py).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'ratelimit': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'todos-ratelimit',
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+        },
+    },
+    'todos': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'todos-objects',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            # Evict the least recently used 1% when full.
+            'CULL_FREQUENCY': 100,
+        },
+    },
+}
+
+TODO_CACHE_ALIAS = 'todos'
+
+# Recurring TODOs (see todos/recurrence.py): occurrences due within this many
+# days are stored; later ones are computed on the fly.
+RECURRENCE_WINDOW_DAYS = 7
+# The list view enqueues the window check at most once per this many seconds.
+RECURRENCE_MATERIALIZE_INTERVAL = 60
+
+# Background tasks (see todos/taskqueue.py): 'thread' runs them on a
+# process-local pool after commit, 'database' stores them for
+# `manage.py run_worker`, 'immediate' runs them inline.
+TASK_QUEUE_MODE = 'thread'
+TASK_QUEUE_WORKERS = 2
+TASK_QUEUE_BATCH_SIZE = 100
+TASK_QUEUE_MAX_RETRIES = 3
+# Seconds before the first retry; doubled on each further attempt.
+TASK_QUEUE_RETRY_DELAY = 1.0
+# Running tasks older than this are assumed lost and queued again.
+TASK_QUEUE_LEASE_SECONDS = 300
+# Seconds to drain the thread pool for at interpreter exit.
+TASK_QUEUE_SHUTDOWN_TIMEOUT = 10
+
+# Audit trail (see todos/audit.py): entries are written in batches of this
+# many, or once the oldest buffered entry is this many seconds old.
+AUDIT_BUFFER_SIZE = 100
+AUDIT_FLUSH_INTERVAL = 5.0
+# Entries kept in memory while the database cannot be written to.
+AUDIT_BUFFER_LIMIT = 10_000
+
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -103,6 +164,55 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# ``collectstatic`` writes hashed, precompressed files here, which
+# todos.assets.StaticAssetMiddleware serves (see todos/assets.py).
+
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'todos.assets.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Cache lifetime of hashed static files, which are served as immutable.
+
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+
+# Write rate limiting (see todos/ratelimit.py)
+# Per URL name, token buckets of (burst, refills per second): 'client' per
+# user or remote address, 'object' per TODO shared by all clients.
+
+RATE_LIMITS = {
+    'todo-create': {'client': (20, 0.5)},
+    'todo-edit': {'client': (20, 0.5), 'object': (10, 0.5)},
+    'todo-delete': {'client': (20, 0.5)},
+    'todo-toggle': {'client': (30, 2.0), 'object': (10, 1.0)},
+}
+
+RATE_LIMIT_CACHE_ALIAS = 'ratelimit'
+
+# Unsafe requests processed at once per process; more are shed with 503.
+
+RATE_LIMIT_MAX_CONCURRENT_WRITES = 8
+
+# Request profiling (see todos/profiling.py)
+# Fraction of requests to profile; requests sending a valid signed
+# PROFILING_HEADER are always profiled.
+
+PROFILING_SAMPLE_RATE = 0.0
+
+PROFILING_HEADER = 'X-Profile'
+
+PROFILING_HEADER_MAX_AGE = 3600
+
+PROFILING_STACK_INTERVAL = 0.001
+
+PROFILING_TOP_ALLOCATIONS = 25
+
 # Default primary key field type
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -1,19 +1,61 @@
 from django.contrib import admin
-from .models import Todo
+from .models import AuditEntry, RecurrenceRule, Tag, Task, Todo
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'open_count', 'closed_count')
+    search_fields = ('name',)
+    prepopulated_fields = {'slug': ('name',)}
+    readonly_fields = ('open_count', 'closed_count')
+
+
+@admin.register(RecurrenceRule)
+class RecurrenceRuleAdmin(admin.ModelAdmin):
+    list_display = ('template', 'frequency', 'interval', 'until', 'max_occurrences', 'next_date')
+    list_select_related = ('template',)
+    raw_id_fields = ('template',)
+    readonly_fields = ('materialized_count', 'next_date')
+
+
+@admin.register(AuditEntry)
+class AuditEntryAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'todo_id', 'action', 'actor', 'source')
+    list_filter = ('action', 'month')
+    search_fields = ('=todo_id', 'actor')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'dedup_key', 'run_after', 'enqueued_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('enqueued_at', 'started_at', 'claimed_by', 'last_error')
 
 
 @admin.register(Todo)
 class TodoAdmin(admin.ModelAdmin):
-    list_display = ('title', 'is_resolved', 'due_date', 'created_at')
-    list_filter = ('is_resolved', 'due_date', 'created_at')
+    list_display = ('title', 'is_resolved', 'due_date', 'parent', 'created_at')
+    list_select_related = ('parent',)
+    raw_id_fields = ('parent',)
+    list_filter = ('is_resolved', 'tags', 'due_date', 'created_at')
+    filter_horizontal = ('tags',)
     search_fields = ('title', 'description')
     readonly_fields = ('created_at', 'updated_at')
     fieldsets = (
         ('Basic Information', {
-            'fields': ('title', 'description')
+            'fields': ('title', 'description', 'parent')
         }),
         ('Status', {
-            'fields': ('is_resolved',)
+            'fields': ('is_resolved', 'tags')
         }),
         ('Dates', {
             'fields': ('due_date', 'created_at', 'updated_at')
@@ -0,0 +1,176 @@
+"""
+Static asset storage and serving with hashed names and precompressed variants.
+
+``collectstatic`` copies every file to ``STATIC_ROOT`` under a content-hashed
+name (``app.3f2a9c1e8b7d.css``) recorded in ``staticfiles.json``, then writes
+``.gz`` and, when the optional ``brotli`` package is installed, ``.br``
+variants next to each text file. A hashed name never changes content, so
+``StaticAssetMiddleware`` serves those files with a year-long ``immutable``
+``Cache-Control``: repeat page loads fetch only the HTML. Files requested by
+their unhashed names are served too, but must be revalidated.
+
+Bootstrap is vendored byte-for-byte under ``todos/static/todos/vendor/``
+(see ``manage.py vendor_assets``) rather than loaded from a CDN, so the app
+works offline.
+"""
+
+import base64
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (
+    HashedFilesMixin, ManifestStaticFilesStorage, StaticFilesStorage, staticfiles_storage,
+)
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.utils.regex_helper import _lazy_re_compile
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+# Pinned third-party assets: static path -> (source URL, Subresource Integrity hash).
+VENDORED = {
+    'todos/vendor/bootstrap/bootstrap.min.css': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css',
+        'sha384-T3c6CoIi6uLrA9TneNEoa7RxnatzjcDSCmG1MXxSR1GAsXEV/Dwwykc2MPK8M2HN',
+    ),
+    'todos/vendor/bootstrap/bootstrap.bundle.min.js': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js',
+        'sha384-C6RzsynM9kWDrMNeT87bh95OGNyZPhcTNXj1NW7RuBCsyN/o0jlpcV8Qyq46cDfL',
+    ),
+}
+
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.txt', '.json', '.html', '.xml')
+# Smaller files fit in one packet either way.
+MIN_COMPRESS_SIZE = 256
+
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_accepts = {
+    'br': _lazy_re_compile(r'\bbr\b'),
+    'gzip': _lazy_re_compile(r'\bgzip\b'),
+}
+
+
+def integrity(data):
+    """The ``sha384-...`` Subresource Integrity hash of ``data``."""
+    return 'sha384-' + base64.b64encode(hashlib.sha384(data).digest()).decode()
+
+
+def _compressors():
+    yield '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Hashed static files with ``.gz``/``.br`` variants written at collect time."""
+
+    # Vendored files keep their ``sourceMappingURL`` comments so that they
+    # match their pinned hashes, but the maps are not vendored: only rewrite
+    # ``url()`` and ``@import`` references.
+    patterns = (
+        ('*.css', HashedFilesMixin.patterns[0][1][:2]),
+    )
+
+    def url(self, name, force=False):
+        try:
+            return super().url(name, force)
+        except ValueError:
+            # Not collected yet (a fresh checkout, the test suite): the
+            # unhashed name still resolves through the finders.
+            return StaticFilesStorage.url(self, name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            yield name, hashed_name, processed
+            if not isinstance(processed, Exception):
+                names.update(n for n in (name, hashed_name) if n)
+        if not dry_run:
+            for name in sorted(names):
+                self.compress(name)
+
+    def compress(self, name):
+        """Write the compressed variants of ``name`` that are worth keeping."""
+        if not name.endswith(COMPRESSIBLE):
+            return
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        for suffix, compress in _compressors():
+            packed = compress(data) if len(data) >= MIN_COMPRESS_SIZE else None
+            if packed is not None and len(packed) < len(data) * 0.95:
+                with open(path + suffix, 'wb') as variant:
+                    variant.write(packed)
+            elif os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+class StaticAssetMiddleware:
+    """
+    Serve files collected into ``STATIC_ROOT``, precompressed when the client accepts it.
+
+    Hashed names from the manifest are cached for ``STATIC_MAX_AGE`` seconds as
+    ``immutable``; anything else gets ``no-cache`` and answers conditional
+    requests with 304. Requests for missing files fall through to the views.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.root = settings.STATIC_ROOT
+        self.prefix = settings.STATIC_URL
+        self.max_age = getattr(settings, 'STATIC_MAX_AGE', 365 * 24 * 60 * 60)
+        self.hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+    def __call__(self, request):
+        if (
+            self.root
+            and request.method in ('GET', 'HEAD')
+            and request.path_info.startswith(self.prefix)
+        ):
+            response = self.serve(request, request.path_info[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        mtime = os.stat(path).st_mtime
+        if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), mtime):
+            response = HttpResponseNotModified()
+        else:
+            accept = request.META.get('HTTP_ACCEPT_ENCODING', '')
+            encoding, served = None, path
+            for candidate, suffix in ENCODINGS:
+                if _accepts[candidate].search(accept) and os.path.isfile(path + suffix):
+                    encoding, served = candidate, path + suffix
+                    break
+            content_type, _ = mimetypes.guess_type(name)
+            response = FileResponse(
+                open(served, 'rb'), content_type=content_type or 'application/octet-stream',
+            )
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+            response.headers['Last-Modified'] = http_date(mtime)
+        if name in self.hashed_names:
+            response.headers['Cache-Control'] = f'public, max-age={self.max_age}, immutable'
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
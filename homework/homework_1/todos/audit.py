@@ -0,0 +1,269 @@
+"""
+Append-only audit trail for ``Todo`` changes, written in batches.
+
+Signal receivers (see ``signals.py``) turn saves, deletes, tag changes and
+bulk updates into ``AuditEntry`` objects with field-level diffs. Each entry is
+handed to ``buffer`` once its transaction commits, and a background thread
+writes the buffer with one ``bulk_create`` whenever it holds
+``AUDIT_BUFFER_SIZE`` entries or its oldest entry is ``AUDIT_FLUSH_INTERVAL``
+seconds old, so a request never pays for its own audit INSERT. After a failed
+write the thread waits ``AUDIT_FLUSH_INTERVAL`` before retrying. The buffer is
+flushed at interpreter exit; entries still buffered when a process is killed
+outright are lost.
+
+SQLite has no table partitioning, so ``AuditEntry.month`` emulates a monthly
+partition key: it leads every index, ``history()`` names the months it reads
+and ``prune()`` drops whole months with one range delete.
+"""
+
+import atexit
+import contextvars
+import logging
+import threading
+import time
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import AuditEntry, Todo
+
+logger = logging.getLogger(__name__)
+
+# Timestamps every entry carries itself.
+IGNORED_FIELDS = {'created_at', 'updated_at'}
+
+_context = contextvars.ContextVar('todos_audit_context', default=None)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def month_key(moment):
+    """``YYYYMM`` of ``moment`` in UTC."""
+    if timezone.is_aware(moment):
+        moment = moment.astimezone(dt_timezone.utc)
+    return moment.year * 100 + moment.month
+
+
+def _shift_month(key, months):
+    index = key // 100 * 12 + key % 100 - 1 + months
+    return index // 12 * 100 + index % 12 + 1
+
+
+class AuditMiddleware:
+    """Remember who is making the current request for audit entries."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        user = getattr(request, 'user', None)
+        authenticated = user is not None and user.is_authenticated
+        token = _context.set({
+            'actor_id': user.pk if authenticated else None,
+            'actor': user.get_username() if authenticated else '',
+            'source': f'{request.method} {request.path}'[:200],
+        })
+        try:
+            return self.get_response(request)
+        finally:
+            _context.reset(token)
+
+
+class AuditBuffer:
+    """Entries waiting to be written, flushed by a daemon thread."""
+
+    def __init__(self):
+        self._ready = threading.Condition()
+        self._entries = []
+        self._oldest = None
+        self._retry_at = None
+        self._thread = None
+        self.flushed = self.batches = self.dropped = 0
+
+    def __len__(self):
+        with self._ready:
+            return len(self._entries)
+
+    def add(self, entry):
+        with self._ready:
+            if not self._entries:
+                self._oldest = time.monotonic()
+            self._entries.append(entry)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='todos-audit-flush', daemon=True,
+                )
+                self._thread.start()
+                atexit.register(self.flush)
+            if len(self._entries) >= _setting('AUDIT_BUFFER_SIZE', 100):
+                self._ready.notify_all()
+
+    def _take(self):
+        with self._ready:
+            entries, self._entries, self._oldest = self._entries, [], None
+            return entries
+
+    def _due(self):
+        if not self._entries:
+            return False
+        if self._retry_at is not None and time.monotonic() < self._retry_at:
+            return False
+        if len(self._entries) >= _setting('AUDIT_BUFFER_SIZE', 100):
+            return True
+        return time.monotonic() - self._oldest >= _setting('AUDIT_FLUSH_INTERVAL', 5.0)
+
+    def _run(self):
+        while True:
+            with self._ready:
+                while not self._due():
+                    self._ready.wait(_setting('AUDIT_FLUSH_INTERVAL', 5.0))
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """Write every buffered entry now; returns how many were written."""
+        entries = self._take()
+        if not entries:
+            return 0
+        try:
+            AuditEntry.objects.bulk_create(entries, batch_size=500)
+        except Exception:
+            logger.exception("Could not write %d audit entries", len(entries))
+            self._requeue(entries)
+            return 0
+        with self._ready:
+            self._retry_at = None
+            self.flushed += len(entries)
+            self.batches += 1
+        return len(entries)
+
+    def _requeue(self, entries):
+        # Keep failed entries for the next flush, up to a bound, and give the
+        # database an interval to recover: a full buffer is otherwise due again
+        # at once.
+        limit = _setting('AUDIT_BUFFER_LIMIT', 10_000)
+        with self._ready:
+            self._entries = entries + self._entries
+            if len(self._entries) > limit:
+                self.dropped += len(self._entries) - limit
+                self._entries = self._entries[-limit:]
+            self._oldest = time.monotonic()
+            self._retry_at = self._oldest + _setting('AUDIT_FLUSH_INTERVAL', 5.0)
+
+    def stats(self):
+        with self._ready:
+            return {
+                'buffered': len(self._entries),
+                'flushed': self.flushed,
+                'batches': self.batches,
+                'dropped': self.dropped,
+            }
+
+
+buffer = AuditBuffer()
+
+
+def record(todo_id, action, changes):
+    """Queue an entry for ``todo_id``; it is buffered once the transaction commits."""
+    now = timezone.now()
+    entry = AuditEntry(
+        month=month_key(now),
+        todo_id=todo_id,
+        action=action,
+        changes=changes,
+        created_at=now,
+        **(_context.get() or {}),
+    )
+    transaction.on_commit(lambda: buffer.add(entry))
+
+
+def _fields():
+    return [field for field in Todo._meta.concrete_fields if field.name not in IGNORED_FIELDS]
+
+
+def todo_saved(instance, created):
+    """Record the fields a ``save()`` changed."""
+    if created:
+        changes = {
+            field.name: [None, getattr(instance, field.attname)]
+            for field in _fields()
+            if getattr(instance, field.attname) is not None and not field.primary_key
+        }
+        record(instance.pk, AuditEntry.CREATE, changes)
+        return
+    changes = {
+        field.name: [instance.loaded_value(field.attname), getattr(instance, field.attname)]
+        for field in _fields()
+        if instance.changed(field.attname)
+    }
+    if changes:
+        record(instance.pk, AuditEntry.UPDATE, changes)
+
+
+def todo_deleted(instance):
+    changes = {
+        field.name: [getattr(instance, field.attname), None]
+        for field in _fields()
+        if getattr(instance, field.attname) is not None and not field.primary_key
+    }
+    record(instance.pk, AuditEntry.DELETE, changes)
+
+
+def todo_tags_changed(instance, action, reverse, pk_set):
+    """Record tags added to or removed from TODOs."""
+    change = {'post_add': 'added', 'post_remove': 'removed'}.get(action)
+    if change is None or not pk_set:
+        return
+    if not reverse:
+        record(instance.pk, AuditEntry.UPDATE, {'tags': {change: sorted(pk_set)}})
+    else:
+        for todo_id in sorted(pk_set):
+            record(todo_id, AuditEntry.UPDATE, {'tags': {change: [instance.pk]}})
+
+
+def _audited(values):
+    names = {field.name for field in _fields()}
+    return [name for name in values if name in names]
+
+
+def bulk_before(queryset, values):
+    """Capture the affected rows' current values before a bulk update."""
+    fields = _audited(values)
+    if not fields:
+        return None
+    return {row.pop('pk'): row for row in queryset.values('pk', *fields)}
+
+
+def bulk_after(before):
+    """Record one entry per row a bulk update actually changed."""
+    if not before:
+        return
+    fields = list(next(iter(before.values())))
+    after = Todo.objects.filter(pk__in=list(before)).values('pk', *fields)
+    for row in after:
+        old = before[row['pk']]
+        changes = {name: [old[name], row[name]] for name in fields if old[name] != row[name]}
+        if changes:
+            record(row['pk'], AuditEntry.BULK_UPDATE, changes)
+
+
+def history(todo_id, months=12):
+    """Entries for ``todo_id`` from the last ``months`` months, newest first."""
+    current = month_key(timezone.now())
+    keys = [_shift_month(current, -offset) for offset in range(months)]
+    return AuditEntry.objects.filter(month__in=keys, todo_id=todo_id).order_by('-created_at', '-id')
+
+
+def prune(keep_months, now=None):
+    """Delete every month older than the last ``keep_months``; returns rows deleted."""
+    current = month_key(now or timezone.now())
+    deleted, _ = AuditEntry.objects.filter(
+        month__lt=_shift_month(current, -(keep_months - 1)),
+    ).delete()
+    return deleted
@@ -0,0 +1,162 @@
+"""
+Per-pk object cache for ``Todo``.
+
+``Todo.cached.get(pk)`` reads through the ``TODO_CACHE_ALIAS`` cache. Saves
+write the fresh instance through and deletes evict it (see ``signals.py``).
+Bulk ``QuerySet.update()``/``bulk_update()`` calls cannot name every affected
+row cheaply, so they bump a generation number that is used as the cache key
+version, which makes every older entry unreachable at once.
+
+Nothing reaches the cache before its transaction commits: writes evict the
+entry at once, so the transaction itself reads the database, and the fresh
+copy is stored (or the entry evicted, or the generation bumped) again from
+``transaction.on_commit``, which also drops anything a concurrent reader
+cached from the row as it was before the commit. A rolled-back transaction
+leaves only the eviction behind. Read-through fills use ``add()``, so a fill
+computed before a write can never overwrite that write's fresh copy.
+
+The default cache is a process-local locmem, and other processes (a second
+server worker, ``manage.py run_worker``) cannot invalidate it. Views that
+write therefore save only the columns they change; run more than one process
+against one database only with a shared cache backend, or read through
+``Todo.objects`` before writing.
+"""
+
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import models, transaction
+
+from .querysets import TodoQuerySet
+
+GENERATION_KEY = 'todos:todo:generation'
+
+
+def _cache():
+    return caches[getattr(settings, 'TODO_CACHE_ALIAS', 'default')]
+
+
+def _key(pk):
+    return f'todos:todo:{pk}'
+
+
+class CacheStats:
+    """Process-local hit/miss counters for the object cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = self.writes = self.evictions = self.invalidations = 0
+
+    def incr(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+stats = CacheStats()
+
+
+def generation():
+    """Return the current key version, creating it on first use."""
+    cache = _cache()
+    current = cache.get(GENERATION_KEY)
+    if current is None:
+        # Seed from the clock so that a generation key evicted by the LRU can
+        # never come back at a value that older entries were stored under.
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+        current = cache.get(GENERATION_KEY)
+    return current
+
+
+def _bump():
+    cache = _cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        generation()
+        cache.incr(GENERATION_KEY)
+    stats.incr('invalidations')
+
+
+def bump_generation():
+    """Invalidate every cached TODO, e.g. after a bulk update."""
+    _bump()
+    transaction.on_commit(_bump)
+
+
+def _evict(pk):
+    _cache().delete(_key(pk), version=generation())
+    stats.incr('evictions')
+
+
+def _store(instance):
+    _cache().set(_key(instance.pk), instance, version=generation())
+    stats.incr('writes')
+
+
+def store(instance):
+    """Write a saved instance through to the cache once it commits."""
+    _evict(instance.pk)
+    if instance.get_deferred_fields():
+        # A partially loaded instance must not be served as a full one.
+        transaction.on_commit(lambda: _evict(instance.pk))
+        return
+    # Later changes to ``instance`` before the commit must not leak in.
+    snapshot = copy.copy(instance)
+    transaction.on_commit(lambda: _store(snapshot))
+
+
+def evict(pk):
+    """Drop ``pk`` from the cache now and again once the delete commits."""
+    _evict(pk)
+    transaction.on_commit(lambda: _evict(pk))
+
+
+def cache_stats():
+    """Return hit/miss counters plus size and bounds for locmem backends."""
+    cache = _cache()
+    lookups = stats.hits + stats.misses
+    data = {
+        'hits': stats.hits,
+        'misses': stats.misses,
+        'hit_ratio': round(stats.hits / lookups, 4) if lookups else None,
+        'writes': stats.writes,
+        'evictions': stats.evictions,
+        'invalidations': stats.invalidations,
+    }
+    if isinstance(cache, LocMemCache):
+        data['entries'] = len(cache._cache)
+        data['max_entries'] = cache._max_entries
+    return data
+
+
+class CachedTodoManager(models.Manager.from_queryset(TodoQuerySet)):
+    """
+    Manager exposing cached single-object lookups as ``Todo.cached.get(pk)``.
+
+    Its querysets are ``TodoQuerySet``s, so bulk writes through it still
+    invalidate the cache.
+    """
+
+    def get(self, pk):
+        cache = _cache()
+        version = generation()
+        instance = cache.get(_key(pk), version=version)
+        if instance is not None:
+            stats.incr('hits')
+            return instance
+        stats.incr('misses')
+        instance = self.get_queryset().get(pk=pk)
+        # ``add`` rather than ``set``: a write-through that landed since the
+        # read holds a fresher copy. Rows read inside a transaction are only
+        # cached once it commits.
+        snapshot = copy.copy(instance)
+        transaction.on_commit(lambda: cache.add(_key(pk), snapshot, version=version))
+        return instance
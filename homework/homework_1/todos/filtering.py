@@ -0,0 +1,93 @@
+"""
+Status, overdue, due-date range and sort options for the TODO list.
+
+Every sort key has two composite indexes on ``Todo`` (see ``Todo.Meta``):
+``(parent, <key>)`` and ``(parent, is_resolved, <key>)``. The list always
+constrains ``parent`` and, when filtering by status or overdue,
+``is_resolved`` by equality, so SQLite walks one of those indexes in sort
+order and never needs a temporary B-tree to sort a page. Ties are broken on
+``id`` in the same direction as the sort key; the row id is the implicit
+last column of every SQLite index, which keeps the order total (and so
+stable across pages) at no extra cost.
+"""
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+STATUS_OPEN = 'open'
+STATUS_RESOLVED = 'resolved'
+STATUSES = (STATUS_OPEN, STATUS_RESOLVED)
+
+SORT_FIELDS = {
+    'due': 'due_date',
+    'created': 'created_at',
+    'updated': 'updated_at',
+    'title': 'title',
+}
+SORT_CHOICES = [
+    ('-created', 'Newest first'),
+    ('created', 'Oldest first'),
+    ('due', 'Due date (earliest first)'),
+    ('-due', 'Due date (latest first)'),
+    ('-updated', 'Recently updated'),
+    ('updated', 'Least recently updated'),
+    ('title', 'Title (A-Z)'),
+    ('-title', 'Title (Z-A)'),
+]
+DEFAULT_SORT = '-created'
+
+
+def _date(value):
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def parse_params(params):
+    """
+    Clean list query parameters into keyword arguments for ``filter_todos``.
+
+    Unknown or malformed values fall back to "no filter" and the default
+    sort rather than raising, like ``?per_page``.
+    """
+    status = params.get('status', '')
+    sort = params.get('sort', DEFAULT_SORT)
+    return {
+        'status': status if status in STATUSES else None,
+        'overdue': params.get('overdue', '') in ('1', 'true', 'on'),
+        'due_after': _date(params.get('due_after')),
+        'due_before': _date(params.get('due_before')),
+        'sort': sort if sort.lstrip('-') in SORT_FIELDS else DEFAULT_SORT,
+    }
+
+
+def filter_todos(queryset, status=None, overdue=False, due_after=None, due_before=None,
+                 sort=DEFAULT_SORT, today=None):
+    """
+    Apply list filters and a stable sort to ``queryset``.
+
+    ``due_after`` and ``due_before`` are inclusive. Overdue TODOs are open
+    ones due before ``today``, so ``overdue`` combined with the resolved
+    status matches nothing.
+    """
+    if overdue:
+        if status == STATUS_RESOLVED:
+            return queryset.none()
+        status = STATUS_OPEN
+        if today is None:
+            today = timezone.now().date()
+        queryset = queryset.filter(due_date__lt=today)
+    if status is not None:
+        # ``is_resolved=False`` compiles to ``NOT is_resolved``, which SQLite
+        # cannot match against an index column; ``IN (0)`` is an equality.
+        queryset = queryset.filter(is_resolved__in=[status == STATUS_RESOLVED])
+    if due_after is not None:
+        queryset = queryset.filter(due_date__gte=due_after)
+    if due_before is not None:
+        queryset = queryset.filter(due_date__lte=due_before)
+
+    descending = sort.startswith('-')
+    field = SORT_FIELDS[sort.lstrip('-')]
+    prefix = '-' if descending else ''
+    return queryset.order_by(prefix + field, prefix + 'id')
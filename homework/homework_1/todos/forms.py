@@ -1,13 +1,39 @@
 from django import forms
-from .models import Todo
+from . import recurrence
+from .models import RecurrenceRule, Todo
 
 
 class TodoForm(forms.ModelForm):
     """Form for creating and editing TODO items."""
+
+    repeat = forms.ChoiceField(
+        label='Repeats',
+        required=False,
+        choices=[('', 'Does not repeat')] + RecurrenceRule.FREQUENCY_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    repeat_interval = forms.IntegerField(
+        label='Every',
+        min_value=1,
+        initial=1,
+        required=False,
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+    )
+    repeat_until = forms.DateField(
+        label='Until',
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+    )
+    repeat_count = forms.IntegerField(
+        label='Occurrences',
+        min_value=1,
+        required=False,
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+    )
     
     class Meta:
         model = Todo
-        fields = ['title', 'description', 'due_date', 'is_resolved']
+        fields = ['title', 'description', 'due_date', 'is_resolved', 'parent', 'tags']
         widgets = {
             'title': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -26,10 +52,77 @@ class TodoForm(forms.ModelForm):
             'is_resolved': forms.CheckboxInput(attrs={
                 'class': 'form-check-input',
             }),
+            # A raw id rather than a <select> of every TODO in the table.
+            'parent': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': 1,
+                'placeholder': 'ID of the parent TODO',
+            }),
+            'tags': forms.CheckboxSelectMultiple(),
         }
         labels = {
             'title': 'Title',
             'description': 'Description',
             'due_date': 'Due Date',
             'is_resolved': 'Mark as Resolved',
+            'parent': 'Subtask of',
+            'tags': 'Tags',
+        }
+        help_texts = {
+            'parent': 'Leave empty for a top-level TODO.',
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Cycles are rejected by ``Todo.clean()``.
+        self.fields['parent'].queryset = Todo.objects.only('id', 'title')
+
+        self.rule = None
+        if self.instance.pk and self.instance.recurrence_rule_id:
+            self.rule = RecurrenceRule.objects.filter(template=self.instance).first()
+            if self.rule is None:
+                # Occurrences follow their template's schedule.
+                for name in ('repeat', 'repeat_interval', 'repeat_until', 'repeat_count'):
+                    del self.fields[name]
+                return
+        if self.rule is not None:
+            self.initial.update(
+                repeat=self.rule.frequency,
+                repeat_interval=self.rule.interval,
+                repeat_until=self.rule.until,
+                repeat_count=self.rule.max_occurrences,
+            )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('repeat') and not cleaned_data.get('due_date'):
+            self.add_error('due_date', 'Recurring TODOs need a due date.')
+        return cleaned_data
+
+    def save(self, commit=True):
+        todo = super().save(commit=commit)
+        if commit:
+            self.save_recurrence()
+        return todo
+
+    def save_recurrence(self):
+        """Start, change or stop the repeat schedule of the saved TODO."""
+        if 'repeat' not in self.fields:
+            return
+        frequency = self.cleaned_data.get('repeat')
+        schedule = {
+            'interval': self.cleaned_data.get('repeat_interval') or 1,
+            'until': self.cleaned_data.get('repeat_until'),
+            'max_occurrences': self.cleaned_data.get('repeat_count'),
         }
+        if self.rule is not None and not frequency:
+            # Stored occurrences stay as ordinary TODOs. Unlinking them through
+            # the queryset (rather than SET_NULL) keeps the object cache fresh.
+            Todo.objects.filter(recurrence_rule=self.rule).update(recurrence_rule=None)
+            self.instance.recurrence_rule = None
+            self.rule.delete()
+            self.rule = None
+        elif self.rule is not None:
+            recurrence.reschedule(self.rule, frequency, **schedule)
+        elif frequency:
+            self.rule = recurrence.start(self.instance, frequency, **schedule)
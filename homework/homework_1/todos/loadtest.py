@@ -0,0 +1,246 @@
+"""
+In-process load-test driver for the TODO app.
+
+Workers replay a weighted mix of operations either straight into
+``project.wsgi.application`` or against a running server over HTTP, and
+record one ``(operation, latency, ok)`` sample per request. ``build_report``
+turns the samples into throughput, latency percentiles and error rates per
+operation. See ``manage.py loadtest``.
+"""
+
+import io
+import math
+import random
+import time
+from collections import defaultdict
+from datetime import timedelta
+from http.cookies import SimpleCookie
+from urllib import error, parse, request as urlrequest
+from wsgiref.util import setup_testing_defaults
+
+from django.db import connections
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+OPERATIONS = ('list', 'deep_page', 'create', 'edit', 'toggle', 'delete')
+
+DEFAULT_MIX = {
+    'list': 40,
+    'deep_page': 10,
+    'create': 15,
+    'edit': 15,
+    'toggle': 15,
+    'delete': 5,
+}
+
+
+def parse_mix(value):
+    """Parse ``'list=40,create=10'`` into a weight mapping."""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}'; expected one of {', '.join(OPERATIONS)}")
+        try:
+            mix[name] = int(weight)
+        except ValueError:
+            raise ValueError(f"Invalid weight for '{name}': '{weight}'") from None
+        if mix[name] < 0:
+            raise ValueError(f"Weight for '{name}' must not be negative")
+    if not any(mix.values()):
+        raise ValueError("At least one operation needs a positive weight")
+    return mix
+
+
+class WSGIClient:
+    """Call a WSGI application directly, carrying a CSRF cookie/header pair."""
+
+    def __init__(self, application):
+        self.application = application
+        self.csrf_token = get_random_string(32)
+
+    def request(self, method, path, data=None):
+        body = parse.urlencode(data or {}).encode()
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)),
+            'HTTP_COOKIE': f'csrftoken={self.csrf_token}',
+            'HTTP_X_CSRFTOKEN': self.csrf_token,
+            'wsgi.input': io.BytesIO(body),
+        }
+        setup_testing_defaults(environ)
+        status = []
+
+        def start_response(status_line, headers, exc_info=None):
+            status.append(int(status_line.split(' ', 1)[0]))
+
+        result = self.application(environ, start_response)
+        try:
+            for _ in result:
+                pass
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return status[0]
+
+
+class HTTPClient:
+    """Send requests to a running server, without following redirects."""
+
+    class _NoRedirect(urlrequest.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.csrf_token = get_random_string(32)
+        self.opener = urlrequest.build_opener(self._NoRedirect)
+
+    def request(self, method, path, data=None):
+        cookie = SimpleCookie()
+        cookie['csrftoken'] = self.csrf_token
+        req = urlrequest.Request(
+            self.base_url + path,
+            data=parse.urlencode(data).encode() if data is not None else None,
+            method=method,
+            headers={
+                'Cookie': cookie.output(header='', attrs=[]).strip(),
+                'X-CSRFToken': self.csrf_token,
+                'Referer': self.base_url + '/',
+            },
+        )
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except error.HTTPError as exc:
+            return exc.code
+
+
+def _form_data(rng, title):
+    due_date = timezone.now().date() + timedelta(days=rng.randint(-10, 30))
+    data = {
+        'title': title,
+        'description': 'Generated by manage.py loadtest',
+        'due_date': due_date.isoformat(),
+    }
+    if rng.random() < 0.3:
+        data['is_resolved'] = 'on'
+    return data
+
+
+def init_worker_process():
+    """``ProcessPoolExecutor`` initializer for start methods that do not fork."""
+    import django
+    django.setup()
+
+
+def run_worker(config):
+    """
+    Run one worker until its request budget or deadline is exhausted.
+
+    ``config`` is a plain dict so it can be sent to worker processes. It holds
+    ``worker``, ``mix``, ``pks`` (the TODO ids this worker may edit or delete),
+    ``page_count``, ``requests``, ``deadline`` (a ``time.time()`` value),
+    ``base_url`` (``None`` for direct WSGI calls) and ``seed``.
+    """
+    rng = random.Random(config['seed'])
+    if config['base_url']:
+        client = HTTPClient(config['base_url'])
+    else:
+        from project.wsgi import application
+        client = WSGIClient(application)
+
+    names = list(config['mix'])
+    weights = [config['mix'][name] for name in names]
+    pks = list(config['pks'])
+    page_count = max(config['page_count'], 1)
+    samples = []
+    sent = 0
+    try:
+        while sent < config['requests'] and time.time() < config['deadline']:
+            operation = rng.choices(names, weights)[0]
+            if operation in ('edit', 'toggle', 'delete') and not pks:
+                operation = 'create'
+            pk = rng.choice(pks) if pks else None
+            if operation == 'list':
+                method, path, data = 'GET', '/todos/', None
+            elif operation == 'deep_page':
+                page = rng.randint(max(page_count // 2, 1), page_count)
+                method, path, data = 'GET', f'/todos/?page={page}', None
+            elif operation == 'create':
+                title = f"Load test {config['worker']}-{sent}"
+                method, path, data = 'POST', '/todos/create/', _form_data(rng, title)
+            elif operation == 'edit':
+                data = _form_data(rng, f"Edited by worker {config['worker']}")
+                method, path = 'POST', f'/todos/{pk}/edit/'
+            elif operation == 'toggle':
+                method, path, data = 'POST', f'/todos/{pk}/toggle/', {}
+            else:
+                pks.remove(pk)
+                method, path, data = 'POST', f'/todos/{pk}/delete/', {}
+
+            start = time.perf_counter()
+            try:
+                status = client.request(method, path, data)
+                ok = status < 400
+            except Exception:
+                ok = False
+            samples.append((operation, time.perf_counter() - start, ok))
+            sent += 1
+    finally:
+        if not config['base_url']:
+            connections.close_all()
+    return samples
+
+
+def _percentile(sorted_values, percent):
+    # Nearest-rank percentile.
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+def build_report(samples, elapsed, **metadata):
+    """Summarise ``(operation, seconds, ok)`` samples into a JSON-able dict."""
+    by_operation = defaultdict(list)
+    errors = defaultdict(int)
+    for operation, seconds, ok in samples:
+        by_operation[operation].append(seconds)
+        if not ok:
+            errors[operation] += 1
+
+    endpoints = {}
+    for operation in OPERATIONS:
+        latencies = sorted(by_operation.get(operation, ()))
+        if not latencies:
+            continue
+        endpoints[operation] = {
+            'requests': len(latencies),
+            'errors': errors[operation],
+            'error_rate': round(errors[operation] / len(latencies), 4),
+            'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+            'latency_ms': {
+                'p50': round(_percentile(latencies, 50) * 1000, 3),
+                'p95': round(_percentile(latencies, 95) * 1000, 3),
+                'p99': round(_percentile(latencies, 99) * 1000, 3),
+                'mean': round(sum(latencies) / len(latencies) * 1000, 3),
+                'max': round(latencies[-1] * 1000, 3),
+            },
+        }
+
+    total_errors = sum(errors.values())
+    return {
+        **metadata,
+        'elapsed_seconds': round(elapsed, 3),
+        'total_requests': len(samples),
+        'total_errors': total_errors,
+        'error_rate': round(total_errors / len(samples), 4) if samples else 0.0,
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+        'endpoints': endpoints,
+    }
@@ -0,0 +1,68 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from todos.models import Todo
+from todos.serializers import serialize_models, serialize_rows
+
+
+class _Rollback(Exception):
+    """Raised to discard the rows seeded for a benchmark run."""
+
+
+class Command(BaseCommand):
+    help = "Compare model-based and values_list-based JSON serialization of TODOs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, nargs='+', default=[10_000, 100_000],
+            help="Row counts to benchmark (default: 10000 100000)",
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help="Runs per serializer; the best time is reported",
+        )
+
+    def handle(self, *args, **options):
+        for rows in options['rows']:
+            try:
+                with transaction.atomic():
+                    self._seed(rows)
+                    model_time = self._best(serialize_models, options['repeat'])
+                    rows_time = self._best(serialize_rows, options['repeat'])
+                    raise _Rollback
+            except _Rollback:
+                pass
+            self.stdout.write(
+                f"{rows:>8} rows  models: {model_time * 1000:9.1f} ms  "
+                f"values_list: {rows_time * 1000:9.1f} ms  "
+                f"speedup: {model_time / rows_time:5.1f}x"
+            )
+
+    def _seed(self, rows):
+        today = timezone.now().date()
+        Todo.objects.all().delete()
+        Todo.objects.bulk_create(
+            (
+                Todo(
+                    title=f"Benchmark TODO {i}",
+                    description="Seeded row" if i % 3 else None,
+                    due_date=today + timedelta(days=i % 30 - 15) if i % 2 else None,
+                    is_resolved=i % 4 == 0,
+                )
+                for i in range(rows)
+            ),
+            batch_size=1000,
+        )
+
+    def _best(self, serializer, repeat):
+        queryset = Todo.objects.all()
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            serializer(queryset)
+            best = min(best, time.perf_counter() - start)
+        return best
@@ -0,0 +1,123 @@
+import json
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from todos.loadtest import DEFAULT_MIX, build_report, init_worker_process, parse_mix, run_worker
+from todos.models import Todo
+from todos.views import TodoListView
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive a mix of list, deep-page, create, edit, toggle and delete requests "
+        "against the app and report throughput, latency percentiles and error rates as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help="Base URL of a running server (default: call project.wsgi.application directly)",
+        )
+        parser.add_argument('--workers', type=int, default=4, help="Concurrent workers (default: 4)")
+        parser.add_argument(
+            '--mode', choices=('threads', 'processes'), default='threads',
+            help="Run workers as threads or processes (default: threads)",
+        )
+        parser.add_argument(
+            '--duration', type=float, default=10.0,
+            help="Stop after this many seconds (default: 10)",
+        )
+        parser.add_argument(
+            '--requests', type=int,
+            help="Stop after this many requests in total (default: no limit)",
+        )
+        parser.add_argument(
+            '--mix',
+            default=','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items()),
+            help="Operation weights, e.g. 'list=40,deep_page=10,create=15,edit=15,toggle=15,delete=5'",
+        )
+        parser.add_argument(
+            '--seed-rows', type=int, default=0,
+            help="Create this many TODOs before the run",
+        )
+        parser.add_argument('--random-seed', type=int, default=0, help="Seed for the operation mix")
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout")
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        workers = options['workers']
+        if workers < 1:
+            raise CommandError("--workers must be at least 1")
+
+        if options['seed_rows']:
+            self._seed(options['seed_rows'])
+        pks = list(Todo.objects.values_list('pk', flat=True))
+        page_count = math.ceil(len(pks) / TodoListView.paginate_by)
+
+        total = options['requests']
+        deadline = time.time() + options['duration']
+        configs = [
+            {
+                'worker': i,
+                'mix': mix,
+                'pks': pks[i::workers],
+                'page_count': page_count,
+                'requests': (total // workers + (i < total % workers)) if total else float('inf'),
+                'deadline': deadline,
+                'base_url': options['url'],
+                'seed': options['random_seed'] + i,
+            }
+            for i in range(workers)
+        ]
+
+        if options['mode'] == 'processes':
+            # Worker processes must not inherit this process's open connections.
+            connections.close_all()
+            executor = ProcessPoolExecutor(workers, initializer=init_worker_process)
+        else:
+            executor = ThreadPoolExecutor(workers)
+        start = time.perf_counter()
+        with executor:
+            results = list(executor.map(run_worker, configs))
+        elapsed = time.perf_counter() - start
+
+        report = build_report(
+            [sample for samples in results for sample in samples],
+            elapsed,
+            target=options['url'] or 'wsgi',
+            mode=options['mode'],
+            workers=workers,
+            mix=mix,
+            seeded_rows=len(pks),
+        )
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def _seed(self, rows):
+        today = timezone.now().date()
+        Todo.objects.bulk_create(
+            (
+                Todo(
+                    title=f"Seeded TODO {i}",
+                    description="Created by manage.py loadtest" if i % 2 else None,
+                    due_date=today + timedelta(days=i % 60 - 20) if i % 3 else None,
+                    is_resolved=i % 4 == 0,
+                )
+                for i in range(rows)
+            ),
+            batch_size=1000,
+        )
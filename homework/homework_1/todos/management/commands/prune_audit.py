@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from todos import audit
+
+
+class Command(BaseCommand):
+    help = "Delete audit entries from months older than the most recent ones kept."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-months', type=int, default=12,
+            help="Number of months to keep, including the current one (default: 12)",
+        )
+
+    def handle(self, *args, **options):
+        if options['keep_months'] < 1:
+            raise CommandError("--keep-months must be at least 1")
+        deleted = audit.prune(options['keep_months'])
+        self.stdout.write(f"Deleted {deleted} audit entries")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from todos import rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily rollup rows from the current TODOs."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            written = rollups.rebuild()
+        self.stdout.write(f"Wrote {written} daily rollup row(s)")
@@ -0,0 +1,72 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from todos import taskqueue
+
+
+class Command(BaseCommand):
+    help = "Run background tasks stored by TASK_QUEUE_MODE = 'database'."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help="Tasks claimed per poll (default: TASK_QUEUE_BATCH_SIZE)",
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help="Seconds to sleep when the queue is empty (default: 1)",
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Drain the due tasks and exit instead of polling forever",
+        )
+
+    def handle(self, *args, **options):
+        self._stopping = False
+        previous = {
+            signum: signal.signal(signum, self._stop)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        try:
+            processed = self._loop(options)
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+        stats = taskqueue.queue_stats()
+        table = taskqueue.table_stats()
+        self.stdout.write(
+            f"Processed {processed} task(s): {stats['succeeded']} succeeded, "
+            f"{stats['retried']} retried, {stats['failed']} failed; "
+            f"{table['depth']} queued, {table['failed_rows']} failed in total"
+        )
+
+    def _loop(self, options):
+        processed = 0
+        while not self._stopping:
+            close_old_connections()
+            requeued = taskqueue.requeue_stale()
+            if requeued:
+                self.stderr.write(f"Requeued {requeued} stale task(s)")
+            claimed = taskqueue.claim(options['batch_size'])
+            if claimed:
+                started = time.perf_counter()
+                succeeded = taskqueue.process(claimed)
+                processed += len(claimed)
+                if options['verbosity'] > 1:
+                    self.stdout.write(
+                        f"Ran {len(claimed)} task(s), {succeeded} succeeded, "
+                        f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+                    )
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['poll_interval'])
+        return processed
+
+    def _stop(self, signum, frame):
+        # Finish the claimed batch, then exit.
+        self._stopping = True
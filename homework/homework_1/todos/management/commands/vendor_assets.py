@@ -0,0 +1,35 @@
+import urllib.request
+from pathlib import Path
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from todos.assets import VENDORED, integrity
+
+
+class Command(BaseCommand):
+    help = "Download the pinned third-party static assets into todos/static/."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Download again even if the file is already vendored",
+        )
+
+    def handle(self, *args, **options):
+        root = Path(apps.get_app_config('todos').path) / 'static'
+        for name, (url, expected) in VENDORED.items():
+            target = root / name
+            if target.exists() and not options['force']:
+                self.stdout.write(f"{name} already vendored")
+                continue
+            try:
+                with urllib.request.urlopen(url, timeout=30) as response:
+                    data = response.read()
+            except OSError as exc:
+                raise CommandError(f"Could not download {url}: {exc}")
+            if integrity(data) != expected:
+                raise CommandError(f"{url} does not match its pinned hash {expected}")
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(data)
+            self.stdout.write(f"Vendored {name} ({len(data)} bytes)")
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todos", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="todo",
+            name="parent",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="TODO this one is a subtask of",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="children",
+                to="todos.todo",
+            ),
+        ),
+        migrations.CreateModel(
+            name="TodoClosure",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "depth",
+                    models.PositiveIntegerField(
+                        help_text="Number of levels between ancestor and descendant"
+                    ),
+                ),
+                (
+                    "ancestor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="descendant_links",
+                        to="todos.todo",
+                    ),
+                ),
+                (
+                    "descendant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ancestor_links",
+                        to="todos.todo",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="todoclosure",
+            constraint=models.UniqueConstraint(
+                fields=("ancestor", "descendant"), name="todos_closure_unique_pair"
+            ),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todos", "0002_subtasks"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tag",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        help_text="Display name of the tag", max_length=50, unique=True
+                    ),
+                ),
+                (
+                    "slug",
+                    models.SlugField(
+                        help_text="Identifier used in ?tag= filters", unique=True
+                    ),
+                ),
+                (
+                    "open_count",
+                    models.PositiveIntegerField(
+                        default=0,
+                        editable=False,
+                        help_text="Number of unresolved TODOs with this tag",
+                    ),
+                ),
+                (
+                    "closed_count",
+                    models.PositiveIntegerField(
+                        default=0,
+                        editable=False,
+                        help_text="Number of resolved TODOs with this tag",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+        migrations.AddField(
+            model_name="todo",
+            name="tags",
+            field=models.ManyToManyField(
+                blank=True,
+                help_text="Tags categorising the TODO",
+                related_name="todos",
+                to="todos.tag",
+            ),
+        ),
+    ]
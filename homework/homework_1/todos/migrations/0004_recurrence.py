@@ -0,0 +1,102 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todos", "0003_tags"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecurrenceRule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "frequency",
+                    models.CharField(
+                        choices=[
+                            ("daily", "Daily"),
+                            ("weekly", "Weekly"),
+                            ("monthly", "Monthly"),
+                        ],
+                        help_text="How often the TODO repeats",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "interval",
+                    models.PositiveIntegerField(
+                        default=1, help_text="Repeat every N days, weeks or months"
+                    ),
+                ),
+                (
+                    "start_date",
+                    models.DateField(help_text="Due date of occurrence number 0"),
+                ),
+                (
+                    "until",
+                    models.DateField(
+                        blank=True,
+                        help_text="Last date an occurrence may fall on",
+                        null=True,
+                    ),
+                ),
+                (
+                    "max_occurrences",
+                    models.PositiveIntegerField(
+                        blank=True,
+                        help_text="Total number of occurrences, including the first",
+                        null=True,
+                    ),
+                ),
+                (
+                    "materialized_count",
+                    models.PositiveIntegerField(
+                        default=1, help_text="Number of occurrences stored so far"
+                    ),
+                ),
+                (
+                    "next_date",
+                    models.DateField(
+                        blank=True,
+                        db_index=True,
+                        help_text="Due date of the next occurrence to store, empty once finished",
+                        null=True,
+                    ),
+                ),
+                (
+                    "template",
+                    models.OneToOneField(
+                        help_text="TODO whose title, description and tags each occurrence copies",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="recurrence",
+                        to="todos.todo",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="todo",
+            name="recurrence_rule",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Recurrence this TODO is an occurrence of",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="occurrences",
+                to="todos.recurrencerule",
+            ),
+        ),
+    ]
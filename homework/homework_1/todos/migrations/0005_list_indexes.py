@@ -0,0 +1,61 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todos", "0004_recurrence"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="todo",
+            index=models.Index(fields=["parent", "due_date"], name="todo_list_due_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="todo",
+            index=models.Index(
+                fields=["parent", "is_resolved", "due_date"],
+                name="todo_list_status_due_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="todo",
+            index=models.Index(
+                fields=["parent", "created_at"], name="todo_list_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="todo",
+            index=models.Index(
+                fields=["parent", "is_resolved", "created_at"],
+                name="todo_list_status_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="todo",
+            index=models.Index(
+                fields=["parent", "updated_at"], name="todo_list_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="todo",
+            index=models.Index(
+                fields=["parent", "is_resolved", "updated_at"],
+                name="todo_list_status_updated_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="todo",
+            index=models.Index(fields=["parent", "title"], name="todo_list_title_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="todo",
+            index=models.Index(
+                fields=["parent", "is_resolved", "title"],
+                name="todo_list_status_title_idx",
+            ),
+        ),
+    ]
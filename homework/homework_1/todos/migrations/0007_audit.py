@@ -0,0 +1,104 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:53
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todos", "0006_tasks"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuditEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "month",
+                    models.PositiveIntegerField(
+                        help_text="Partition key, YYYYMM of created_at (UTC)"
+                    ),
+                ),
+                (
+                    "todo_id",
+                    models.BigIntegerField(help_text="TODO the change applies to"),
+                ),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("create", "Created"),
+                            ("update", "Updated"),
+                            ("delete", "Deleted"),
+                            ("bulk_update", "Bulk updated"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "changes",
+                    models.JSONField(
+                        default=dict,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        help_text="Field name -> [old value, new value]",
+                    ),
+                ),
+                (
+                    "actor_id",
+                    models.IntegerField(
+                        blank=True,
+                        help_text="Id of the user who made the change, if any",
+                        null=True,
+                    ),
+                ),
+                (
+                    "actor",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="Username at the time of the change",
+                        max_length=150,
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="Request (method and path) that made the change",
+                        max_length=200,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="When the change was made (not when it was flushed)",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["month", "todo_id", "created_at"],
+                        name="todos_audit_month_todo_idx",
+                    ),
+                    models.Index(
+                        fields=["month", "created_at"],
+                        name="todos_audit_month_time_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -1,6 +1,45 @@
+import calendar
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 
+from .cache import CachedTodoManager
+from .querysets import TodoQuerySet
+
+
+class Tag(models.Model):
+    """Label used to categorise TODOs."""
+
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+        help_text="Display name of the tag"
+    )
+    slug = models.SlugField(
+        max_length=50,
+        unique=True,
+        help_text="Identifier used in ?tag= filters"
+    )
+    open_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of unresolved TODOs with this tag"
+    )
+    closed_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of resolved TODOs with this tag"
+    )
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
 
 class Todo(models.Model):
     """Model representing a TODO item."""
@@ -31,17 +70,430 @@ class Todo(models.Model):
         auto_now=True,
         help_text="When the TODO was last updated"
     )
+    parent = models.ForeignKey(
+        'self',
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='children',
+        help_text="TODO this one is a subtask of"
+    )
+    tags = models.ManyToManyField(
+        Tag,
+        blank=True,
+        related_name='todos',
+        help_text="Tags categorising the TODO"
+    )
+    recurrence_rule = models.ForeignKey(
+        'RecurrenceRule',
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='occurrences',
+        help_text="Recurrence this TODO is an occurrence of"
+    )
+
+    objects = TodoQuerySet.as_manager()
+    cached = CachedTodoManager()
 
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Todo'
         verbose_name_plural = 'Todos'
+        # One pair per list sort key (see todos/filtering.py).
+        indexes = [
+            models.Index(fields=['parent', 'due_date'], name='todo_list_due_idx'),
+            models.Index(fields=['parent', 'is_resolved', 'due_date'], name='todo_list_status_due_idx'),
+            models.Index(fields=['parent', 'created_at'], name='todo_list_created_idx'),
+            models.Index(fields=['parent', 'is_resolved', 'created_at'], name='todo_list_status_created_idx'),
+            models.Index(fields=['parent', 'updated_at'], name='todo_list_updated_idx'),
+            models.Index(fields=['parent', 'is_resolved', 'updated_at'], name='todo_list_status_updated_idx'),
+            models.Index(fields=['parent', 'title'], name='todo_list_title_idx'),
+            models.Index(fields=['parent', 'is_resolved', 'title'], name='todo_list_status_title_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored state so signal handlers can tell what changed.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        # Loading a deferred field comes through here too.
+        deferred = self.get_deferred_fields()
+        loaded = getattr(self, '_loaded_values', {})
+        for field in self._meta.concrete_fields:
+            if field.attname in deferred:
+                continue
+            if fields is None or field.name in fields or field.attname in fields:
+                loaded[field.attname] = getattr(self, field.attname)
+        self._loaded_values = loaded
+
+    def loaded_value(self, attname, default=None):
+        """Return the value ``attname`` had when loaded or last saved."""
+        return getattr(self, '_loaded_values', {}).get(attname, default)
+
+    def changed(self, attname):
+        """
+        Whether ``attname`` differs from its loaded value.
+
+        False when that value is unknown: the field was deferred, or the
+        instance was not loaded from the database.
+        """
+        loaded = getattr(self, '_loaded_values', {})
+        return attname in loaded and getattr(self, attname) != loaded[attname]
+
+    def remember_state(self):
+        """Record the current field values as the stored state."""
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if field.attname not in deferred
+        }
+
+    def nests_under_itself(self):
+        """Whether the new ``parent`` is this TODO or one of its own subtasks."""
+        if self.pk is None or 'parent_id' in self.get_deferred_fields():
+            return False
+        if self.parent_id is None:
+            return False
+        if self.parent_id == self.loaded_value('parent_id', object()):
+            return False
+        return self.parent_id == self.pk or TodoClosure.objects.filter(
+            ancestor_id=self.pk, descendant_id=self.parent_id,
+        ).exists()
+
+    def clean(self):
+        super().clean()
+        if self.nests_under_itself():
+            raise ValidationError({'parent': "A TODO cannot be a subtask of itself or of its own subtasks."})
+
+    def save(self, *args, **kwargs):
+        # The closure table cannot represent a cycle (see ``tree.move``).
+        if self.nests_under_itself():
+            raise ValueError("A TODO cannot be a subtask of itself or of its own subtasks")
+        super().save(*args, **kwargs)
+
     def is_overdue(self):
         """Check if the TODO is overdue (not resolved and past due date)."""
         if self.is_resolved or self.due_date is None:
             return False
         return self.due_date < timezone.now().date()
+
+
+class TodoClosure(models.Model):
+    """Ancestor/descendant pair for nested TODOs (a closure table)."""
+
+    ancestor = models.ForeignKey(
+        Todo,
+        on_delete=models.CASCADE,
+        related_name='descendant_links',
+    )
+    descendant = models.ForeignKey(
+        Todo,
+        on_delete=models.CASCADE,
+        related_name='ancestor_links',
+    )
+    depth = models.PositiveIntegerField(
+        help_text="Number of levels between ancestor and descendant"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['ancestor', 'descendant'],
+                name='todos_closure_unique_pair',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
+
+class RecurrenceRule(models.Model):
+    """
+    Repeat schedule attached to a template TODO.
+
+    Occurrences are only stored once they fall inside the rolling window or
+    the previous one is resolved (see ``todos/recurrence.py``); later dates
+    are computed on the fly from ``start_date`` and the occurrence index.
+    """
+
+    DAILY = 'daily'
+    WEEKLY = 'weekly'
+    MONTHLY = 'monthly'
+    FREQUENCY_CHOICES = [
+        (DAILY, 'Daily'),
+        (WEEKLY, 'Weekly'),
+        (MONTHLY, 'Monthly'),
+    ]
+
+    template = models.OneToOneField(
+        Todo,
+        on_delete=models.CASCADE,
+        related_name='recurrence',
+        help_text="TODO whose title, description and tags each occurrence copies"
+    )
+    frequency = models.CharField(
+        max_length=10,
+        choices=FREQUENCY_CHOICES,
+        help_text="How often the TODO repeats"
+    )
+    interval = models.PositiveIntegerField(
+        default=1,
+        help_text="Repeat every N days, weeks or months"
+    )
+    start_date = models.DateField(
+        help_text="Due date of occurrence number 0"
+    )
+    until = models.DateField(
+        blank=True,
+        null=True,
+        help_text="Last date an occurrence may fall on"
+    )
+    max_occurrences = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        help_text="Total number of occurrences, including the first"
+    )
+    materialized_count = models.PositiveIntegerField(
+        default=1,
+        help_text="Number of occurrences stored so far"
+    )
+    next_date = models.DateField(
+        blank=True,
+        null=True,
+        db_index=True,
+        help_text="Due date of the next occurrence to store, empty once finished"
+    )
+
+    def __str__(self):
+        return f"{self.template} ({self.describe()})"
+
+    def describe(self):
+        unit = {self.DAILY: 'day', self.WEEKLY: 'week', self.MONTHLY: 'month'}[self.frequency]
+        if self.interval == 1:
+            return self.get_frequency_display().lower()
+        return f"every {self.interval} {unit}s"
+
+    def occurrence_date(self, index):
+        """Due date of occurrence ``index``, or None past the end conditions."""
+        if self.max_occurrences is not None and index >= self.max_occurrences:
+            return None
+        if self.frequency == self.DAILY:
+            date = self.start_date + timedelta(days=index * self.interval)
+        elif self.frequency == self.WEEKLY:
+            date = self.start_date + timedelta(weeks=index * self.interval)
+        else:
+            months = self.start_date.month - 1 + index * self.interval
+            year = self.start_date.year + months // 12
+            month = months % 12 + 1
+            day = min(self.start_date.day, calendar.monthrange(year, month)[1])
+            date = self.start_date.replace(year=year, month=month, day=day)
+        if self.until is not None and date > self.until:
+            return None
+        return date
+
+    def upcoming(self, count=3):
+        """The next ``count`` unstored occurrence dates, computed on the fly."""
+        dates = []
+        for index in range(self.materialized_count, self.materialized_count + count):
+            date = self.occurrence_date(index)
+            if date is None:
+                break
+            dates.append(date)
+        return dates
+
+
+class Task(models.Model):
+    """
+    Background task stored for ``manage.py run_worker``.
+
+    Rows are deleted once their task succeeds; failed rows are kept for
+    inspection after their retries run out (see ``todos/taskqueue.py``).
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(
+        max_length=200,
+        help_text="Registered task name"
+    )
+    payload = models.JSONField(
+        default=dict,
+        help_text="Keyword arguments for the task"
+    )
+    dedup_key = models.CharField(
+        max_length=200,
+        blank=True,
+        null=True,
+        help_text="Only one queued task per name may carry the same key"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=QUEUED
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of failed runs so far"
+    )
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        help_text="Earliest time the task may run (pushed back on retries)"
+    )
+    enqueued_at = models.DateTimeField(
+        default=timezone.now
+    )
+    started_at = models.DateTimeField(
+        blank=True,
+        null=True
+    )
+    claimed_by = models.CharField(
+        max_length=32,
+        blank=True,
+        default='',
+        db_index=True,
+        help_text="Token of the worker run that claimed the task"
+    )
+    last_error = models.TextField(
+        blank=True,
+        default=''
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='todos_task_due_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'dedup_key'],
+                condition=models.Q(status='queued'),
+                name='todos_task_unique_queued_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class AuditQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        raise ValueError("Audit entries are append-only")
+
+    update.alters_data = True
+
+
+class AuditEntry(models.Model):
+    """
+    One recorded change to a TODO (see ``todos/audit.py``).
+
+    Entries are append-only and outlive the TODO they describe, so
+    ``todo_id`` is a plain column rather than a foreign key. ``month``
+    (``YYYYMM``) leads every index and stands in for a monthly partition
+    key: history lookups and pruning only touch the months they name.
+    """
+
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    BULK_UPDATE = 'bulk_update'
+    ACTION_CHOICES = [
+        (CREATE, 'Created'),
+        (UPDATE, 'Updated'),
+        (DELETE, 'Deleted'),
+        (BULK_UPDATE, 'Bulk updated'),
+    ]
+
+    month = models.PositiveIntegerField(
+        help_text="Partition key, YYYYMM of created_at (UTC)"
+    )
+    todo_id = models.BigIntegerField(
+        help_text="TODO the change applies to"
+    )
+    action = models.CharField(
+        max_length=20,
+        choices=ACTION_CHOICES
+    )
+    changes = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        help_text="Field name -> [old value, new value]"
+    )
+    actor_id = models.IntegerField(
+        blank=True,
+        null=True,
+        help_text="Id of the user who made the change, if any"
+    )
+    actor = models.CharField(
+        max_length=150,
+        blank=True,
+        default='',
+        help_text="Username at the time of the change"
+    )
+    source = models.CharField(
+        max_length=200,
+        blank=True,
+        default='',
+        help_text="Request (method and path) that made the change"
+    )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="When the change was made (not when it was flushed)"
+    )
+
+    objects = AuditQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['month', 'todo_id', 'created_at'], name='todos_audit_month_todo_idx'),
+            models.Index(fields=['month', 'created_at'], name='todos_audit_month_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_action_display()} TODO {self.todo_id} by {self.actor or 'system'}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Audit entries are append-only")
+        super().save(*args, **kwargs)
+
+
+class DailyRollup(models.Model):
+    """
+    Per-day TODO activity, maintained incrementally (see ``todos/rollups.py``).
+
+    ``created``, ``completed``, ``reopened`` and ``deleted`` count events on
+    ``day``. ``open_delta`` and ``overdue_delta`` are changes to the number of
+    open and overdue TODOs starting that day, so the counts on any day are a
+    running sum over the rows up to it.
+    """
+
+    day = models.DateField(
+        unique=True
+    )
+    created = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    reopened = models.PositiveIntegerField(default=0)
+    deleted = models.PositiveIntegerField(default=0)
+    open_delta = models.IntegerField(default=0)
+    overdue_delta = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['day']
+
+    def __str__(self):
+        return f"{self.day}: +{self.created} / ✓{self.completed}"
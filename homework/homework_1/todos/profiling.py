@@ -0,0 +1,231 @@
+"""
+Opt-in sampling request profiler.
+
+``SamplingProfilerMiddleware`` profiles a random sample of requests
+(``PROFILING_SAMPLE_RATE``) plus any request carrying a valid signed
+``PROFILING_HEADER``. Each profiled request runs under cProfile, tracemalloc
+and a stack sampler thread, and the results are aggregated per URL name in a
+process-local ``ProfileStore`` that the staff-only profiling views read from.
+
+Unsampled requests only pay for one ``random.random()`` call and a header
+lookup. cProfile allows one active profiler per process (Python 3.12 raises
+``ValueError`` for a second), so a request sampled while another is being
+profiled runs unprofiled.
+"""
+
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+
+SIGNING_SALT = 'todos.profiling'
+
+# Held by the request being profiled.
+_profile_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def sign_profile_header():
+    """Return a token that forces profiling when sent in ``PROFILING_HEADER``."""
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign('profile')
+
+
+def _valid_profile_header(value):
+    try:
+        signing.TimestampSigner(salt=SIGNING_SALT).unsign(
+            value, max_age=_setting('PROFILING_HEADER_MAX_AGE', 3600),
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class ProfileStore:
+    """Thread-safe per-URL-name aggregate of cProfile and tracemalloc data."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._stats = {}
+            self._requests = Counter()
+            self._elapsed = Counter()
+            self._allocations = {}
+            self._stacks = {}
+
+    def add(self, url_name, profiler, elapsed, allocations, stacks):
+        with self._lock:
+            if url_name in self._stats:
+                self._stats[url_name].add(profiler)
+            else:
+                self._stats[url_name] = pstats.Stats(profiler, stream=io.StringIO())
+            self._requests[url_name] += 1
+            self._elapsed[url_name] += elapsed
+            self._allocations.setdefault(url_name, Counter()).update(allocations)
+            self._stacks.setdefault(url_name, Counter()).update(stacks)
+
+    def url_names(self):
+        with self._lock:
+            return sorted(self._stats)
+
+    def summary(self):
+        with self._lock:
+            return {
+                name: {
+                    'requests': self._requests[name],
+                    'total_seconds': round(self._elapsed[name], 6),
+                    'mean_seconds': round(self._elapsed[name] / self._requests[name], 6),
+                }
+                for name in sorted(self._stats)
+            }
+
+    def pstats_dump(self, url_name):
+        """Return the aggregated stats in the binary format ``pstats.Stats`` loads."""
+        with self._lock:
+            return marshal.dumps(self._stats[url_name].stats)
+
+    def collapsed_stacks(self, url_name):
+        """Return ``frame;frame;frame <samples>`` lines for flamegraph tools."""
+        with self._lock:
+            return ''.join(
+                f'{stack} {count}\n'
+                for stack, count in self._stacks[url_name].most_common()
+            )
+
+    def top_allocations(self, url_name, limit=None):
+        """Return ``(site, bytes)`` pairs for the largest allocation sites."""
+        if limit is None:
+            limit = _setting('PROFILING_TOP_ALLOCATIONS', 25)
+        with self._lock:
+            return self._allocations[url_name].most_common(limit)
+
+
+store = ProfileStore()
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f'{frame.f_globals.get("__name__", code.co_filename)}:{code.co_name}'
+
+
+class _StackSampler(threading.Thread):
+    """
+    Record the stack of one thread every ``interval`` seconds.
+
+    cProfile only keeps caller/callee pairs, which cannot be turned back into
+    full stacks once calls recurse through the middleware chain, so the
+    collapsed-stack output comes from periodic stack samples instead.
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='todos-stack-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        return self.stacks
+
+
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+
+
+def _start_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_owned = True
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc(snapshot_before):
+    global _tracemalloc_users, _tracemalloc_owned
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ))
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+    return Counter({
+        f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}': stat.size_diff
+        for stat in snapshot.compare_to(snapshot_before, 'lineno')
+        if stat.size_diff > 0
+    })
+
+
+class SamplingProfilerMiddleware:
+    """Profile a sample of requests and aggregate the results per URL name."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = _setting('PROFILING_SAMPLE_RATE', 0.0)
+        self.stack_interval = _setting('PROFILING_STACK_INTERVAL', 0.001)
+        self.header = 'HTTP_' + _setting('PROFILING_HEADER', 'X-Profile').upper().replace('-', '_')
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            token = request.META.get(self.header)
+            if token is None or not _valid_profile_header(token):
+                return self.get_response(request)
+        return self._profile(request)
+
+    def _profile(self, request):
+        if not _profile_lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self._run_profiled(request)
+        finally:
+            _profile_lock.release()
+
+    def _run_profiled(self, request):
+        _start_tracemalloc()
+        before = tracemalloc.take_snapshot()
+        sampler = _StackSampler(threading.get_ident(), self.stack_interval)
+        profiler = cProfile.Profile()
+        sampler.start()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            stacks = sampler.stop()
+            allocations = _stop_tracemalloc(before)
+        match = request.resolver_match
+        url_name = match.view_name if match and match.url_name else 'unresolved'
+        store.add(url_name, profiler, elapsed, allocations, stacks)
+        return response
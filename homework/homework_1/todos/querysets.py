@@ -0,0 +1,33 @@
+"""
+QuerySet for ``Todo`` that announces bulk writes.
+
+``QuerySet.update()`` and ``bulk_update()`` bypass ``save()`` and therefore
+``post_save``. ``bulk_update()`` writes each batch through ``update()``, so
+overriding ``update()`` covers both. Code that keeps derived state (the object cache, tag counters)
+listens to ``pre_bulk_update``/``post_bulk_update`` instead. Both signals get
+the same ``state`` dict so receivers can capture rows before the write, while
+the queryset still matches them.
+"""
+
+from django.db import models
+from django.dispatch import Signal
+
+# Arguments: queryset, values (field name -> new value or expression), state.
+pre_bulk_update = Signal()
+# Arguments: queryset, values, state, rows (number of rows updated).
+post_bulk_update = Signal()
+
+
+class TodoQuerySet(models.QuerySet):
+    """QuerySet whose bulk writes send ``pre_bulk_update``/``post_bulk_update``."""
+
+    def update(self, **kwargs):
+        state = {}
+        pre_bulk_update.send(sender=self.model, queryset=self, values=kwargs, state=state)
+        rows = super().update(**kwargs)
+        post_bulk_update.send(
+            sender=self.model, queryset=self, values=kwargs, state=state, rows=rows,
+        )
+        return rows
+
+    update.alters_data = True
@@ -0,0 +1,177 @@
+"""
+Token-bucket rate limiting and write-concurrency shedding for write views.
+
+``RATE_LIMITS`` maps URL names to up to two buckets, each ``(burst, per
+second)``: ``client`` is keyed by the user (or the remote address of
+anonymous requests), and ``object`` by the ``pk`` URL argument and so shared
+by every client writing the same row. A request takes one token from each of
+its buckets, or from none of them; when either is empty it gets an immediate
+429 with ``Retry-After`` set to when the emptier one refills.
+
+SQLite serialises writers on one lock, so a burst of writes only queues up
+behind it. At most ``RATE_LIMIT_MAX_CONCURRENT_WRITES`` unsafe requests are
+processed at once per process; the rest are shed with 503 rather than waiting.
+
+Bucket state lives in the process-local ``RATE_LIMIT_CACHE_ALIAS`` cache, so
+limits apply per process.
+"""
+
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+# Bucket reads and writes are a read-modify-write on the cache.
+_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _cache():
+    return caches[_setting('RATE_LIMIT_CACHE_ALIAS', 'default')]
+
+
+class RateLimitStats:
+    """Process-local counters of allowed, throttled and shed requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.allowed = self.shed = self.in_flight = self.peak_in_flight = 0
+            self.throttled = {}
+
+    def incr(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def throttle(self, url_name, bucket):
+        key = f'{url_name}:{bucket}'
+        with self._lock:
+            self.throttled[key] = self.throttled.get(key, 0) + 1
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+stats = RateLimitStats()
+
+
+def take(buckets, now=None):
+    """
+    Take one token from every ``(key, burst, rate)`` bucket, or from none.
+
+    Returns the seconds each bucket needs to hold a token again; all zero
+    means the tokens were taken.
+    """
+    now = time.monotonic() if now is None else now
+    cache = _cache()
+    with _lock:
+        levels = []
+        for key, burst, rate in buckets:
+            state = cache.get(key)
+            if state is None:
+                tokens = float(burst)
+            else:
+                tokens, stamp = state
+                tokens = min(float(burst), tokens + (now - stamp) * rate)
+            levels.append(tokens)
+        waits = [
+            (1 - tokens) / rate if tokens < 1 else 0
+            for tokens, (_, _, rate) in zip(levels, buckets)
+        ]
+        spent = 0 if any(waits) else 1
+        for tokens, (key, burst, rate) in zip(levels, buckets):
+            # A bucket untouched for longer than it takes to refill is full anyway.
+            cache.set(key, (tokens - spent, now), timeout=math.ceil(burst / rate) + 1)
+        return waits
+
+
+def client_key(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def buckets_for(request, url_name, view_kwargs):
+    """The ``(name, key, burst, rate)`` buckets limiting this request."""
+    limits = _setting('RATE_LIMITS', {}).get(url_name)
+    if not limits:
+        return []
+    buckets = []
+    if 'client' in limits:
+        buckets.append(('client', f'ratelimit:{url_name}:{client_key(request)}', *limits['client']))
+    if 'object' in limits and 'pk' in view_kwargs:
+        buckets.append(('object', f"ratelimit:{url_name}:pk:{view_kwargs['pk']}", *limits['object']))
+    return buckets
+
+
+def _refused(status, message, retry_after):
+    response = JsonResponse({'success': False, 'message': message}, status=status)
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+class RateLimitMiddleware:
+    """Apply ``RATE_LIMITS`` and the write-concurrency cap to unsafe requests."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slots = threading.BoundedSemaphore(_setting('RATE_LIMIT_MAX_CONCURRENT_WRITES', 8))
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            if getattr(request, '_write_slot', False):
+                request._write_slot = False
+                stats.leave()
+                self.slots.release()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in SAFE_METHODS:
+            return None
+        url_name = request.resolver_match.url_name
+        buckets = buckets_for(request, url_name, view_kwargs)
+        if buckets:
+            waits = take([(key, burst, rate) for _, key, burst, rate in buckets])
+            wait = max(waits)
+            if wait:
+                stats.throttle(url_name, buckets[waits.index(wait)][0])
+                return _refused(429, "Too many requests; slow down.", wait)
+        if not self.slots.acquire(blocking=False):
+            stats.incr('shed')
+            return _refused(503, "Too many writes in progress; try again.", 1)
+        request._write_slot = True
+        stats.enter()
+        stats.incr('allowed')
+        return None
+
+
+def rate_limit_stats():
+    with stats._lock:
+        return {
+            'allowed': stats.allowed,
+            'throttled': dict(stats.throttled),
+            'throttled_total': sum(stats.throttled.values()),
+            'shed': stats.shed,
+            'in_flight_writes': stats.in_flight,
+            'peak_in_flight_writes': stats.peak_in_flight,
+            'max_concurrent_writes': _setting('RATE_LIMIT_MAX_CONCURRENT_WRITES', 8),
+        }
@@ -0,0 +1,140 @@
+"""
+Lazy materialisation of recurring TODOs.
+
+A ``RecurrenceRule`` stores occurrences as ``Todo`` rows only when they fall
+inside the rolling ``RECURRENCE_WINDOW_DAYS`` window, or when the last open
+occurrence is resolved. Everything further out is computed by
+``RecurrenceRule.upcoming()``, so storage stays proportional to the number of
+rules plus their open occurrences rather than to every future date.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import RecurrenceRule, Todo
+
+
+def window_end(today=None):
+    if today is None:
+        today = timezone.now().date()
+    return today + timedelta(days=getattr(settings, 'RECURRENCE_WINDOW_DAYS', 7))
+
+
+def materialize(rule, horizon, minimum=0):
+    """
+    Store the occurrences of ``rule`` due on or before ``horizon``.
+
+    At least ``minimum`` occurrences are stored even if they fall after the
+    horizon (while the end conditions allow). Returns the new TODOs.
+    """
+    dates = []
+    index = rule.materialized_count
+    while True:
+        date = rule.occurrence_date(index)
+        if date is None or (date > horizon and len(dates) >= minimum):
+            break
+        dates.append(date)
+        index += 1
+    if not dates:
+        return []
+
+    next_date = rule.occurrence_date(index)
+    # Claim the occurrence indexes first so that concurrent requests cannot
+    # store the same dates twice.
+    claimed = RecurrenceRule.objects.filter(
+        pk=rule.pk, materialized_count=rule.materialized_count,
+    ).update(materialized_count=index, next_date=next_date)
+    if not claimed:
+        return []
+    rule.materialized_count, rule.next_date = index, next_date
+
+    template = rule.template
+    tag_ids = list(template.tags.values_list('pk', flat=True))
+    occurrences = []
+    for date in dates:
+        occurrence = Todo.objects.create(
+            title=template.title,
+            description=template.description,
+            due_date=date,
+            parent_id=template.parent_id,
+            recurrence_rule=rule,
+        )
+        if tag_ids:
+            occurrence.tags.add(*tag_ids)
+        occurrences.append(occurrence)
+    return occurrences
+
+
+def materialize_due(today=None):
+    """Store every occurrence that has entered the rolling window."""
+    horizon = window_end(today)
+    created = []
+    for rule in RecurrenceRule.objects.filter(next_date__lte=horizon).select_related('template'):
+        created += materialize(rule, horizon)
+    return created
+
+
+def ensure_open_occurrence(rule_ids):
+    """Store the next occurrence of each rule that has no open one left."""
+    rules = RecurrenceRule.objects.filter(
+        pk__in=rule_ids, next_date__isnull=False,
+    ).exclude(
+        occurrences__is_resolved=False,
+    ).select_related('template')
+    created = []
+    for rule in rules:
+        created += materialize(rule, window_end(), minimum=1)
+    return created
+
+
+def occurrence_resolved(todo):
+    """Called when an occurrence of a recurring TODO is resolved."""
+    if todo.recurrence_rule_id is None:
+        return []
+    return ensure_open_occurrence([todo.recurrence_rule_id])
+
+
+def start(template, frequency, interval=1, until=None, max_occurrences=None):
+    """Make ``template`` (due on its ``due_date``) the first of a series."""
+    rule = RecurrenceRule(
+        template=template,
+        frequency=frequency,
+        interval=interval,
+        start_date=template.due_date,
+        until=until,
+        max_occurrences=max_occurrences,
+    )
+    rule.next_date = rule.occurrence_date(1)
+    rule.save()
+    template.recurrence_rule = rule
+    template.save(update_fields=['recurrence_rule', 'updated_at'])
+    materialize(rule, window_end())
+    return rule
+
+
+def reschedule(rule, frequency, interval=1, until=None, max_occurrences=None):
+    """
+    Change the schedule of ``rule``.
+
+    The series restarts from its latest stored occurrence, which keeps every
+    stored date and never produces one earlier than it.
+    """
+    changed = (
+        (rule.frequency, rule.interval, rule.until, rule.max_occurrences)
+        != (frequency, interval, until, max_occurrences)
+    )
+    if not changed:
+        return rule
+    latest = Todo.objects.filter(recurrence_rule=rule).order_by('-due_date').values_list(
+        'due_date', flat=True,
+    ).first()
+    rule.start_date = latest or rule.start_date
+    rule.frequency, rule.interval = frequency, interval
+    rule.until, rule.max_occurrences = until, max_occurrences
+    rule.materialized_count = 1
+    rule.next_date = rule.occurrence_date(1)
+    rule.save()
+    materialize(rule, window_end())
+    return rule
@@ -0,0 +1,196 @@
+"""
+Incrementally maintained daily rollups for trend reports.
+
+Every create, resolution change, due-date change and delete adds its deltas
+to the ``DailyRollup`` rows of the days it affects, one UPDATE per day, so
+reports never group over ``todos_todo``. Open and overdue counts are stocks
+rather than flows: a change on day ``t`` withdraws the TODO's old
+contribution from ``t`` onward and adds its new one, and the count on any day
+is the running sum of ``open_delta``/``overdue_delta`` up to that day.
+
+An open TODO due on ``D`` is overdue from ``D + 1`` until it is resolved or
+deleted.
+"""
+
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db.models import F, Q, Sum, Window
+from django.db.models.functions import Lead
+from django.utils import timezone
+
+from .models import DailyRollup, Todo
+
+COUNTERS = ('created', 'completed', 'reopened', 'deleted')
+
+
+def _contribution(resolved, due_date, day):
+    """Stock deltas of a TODO in this state, from ``day`` onward."""
+    deltas = Counter()
+    if resolved is False:
+        deltas[day, 'open_delta'] += 1
+        if due_date is not None:
+            deltas[max(due_date + timedelta(days=1), day), 'overdue_delta'] += 1
+    return deltas
+
+
+def _transition(deltas, before, after, day):
+    """Add the deltas of a TODO moving from ``before`` to ``after`` on ``day``.
+
+    States are ``(is_resolved, due_date)`` tuples, or None for "does not exist".
+    """
+    if before is not None:
+        deltas.subtract(_contribution(*before, day))
+    if after is not None:
+        deltas.update(_contribution(*after, day))
+    if before is None and after is not None:
+        deltas[day, 'created'] += 1
+        if after[0]:
+            deltas[day, 'completed'] += 1
+    elif before is not None and after is None:
+        deltas[day, 'deleted'] += 1
+    elif before[0] != after[0]:
+        deltas[day, 'completed' if after[0] else 'reopened'] += 1
+
+
+def apply(deltas):
+    """Add ``{(day, column): delta}`` to the rollup rows, one UPDATE per day."""
+    by_day = defaultdict(dict)
+    for (day, column), delta in deltas.items():
+        if delta:
+            by_day[day][column] = delta
+    if not by_day:
+        return
+    DailyRollup.objects.bulk_create(
+        [DailyRollup(day=day) for day in by_day], ignore_conflicts=True,
+    )
+    for day, changes in by_day.items():
+        DailyRollup.objects.filter(day=day).update(
+            **{column: F(column) + delta for column, delta in changes.items()}
+        )
+
+
+def _state(todo):
+    return (todo.is_resolved, todo.due_date)
+
+
+def todo_created(todo):
+    deltas = Counter()
+    _transition(deltas, None, _state(todo), timezone.localdate())
+    apply(deltas)
+
+
+def todo_changed(todo):
+    """Apply a saved change of resolution or due date."""
+    if not todo.changed('is_resolved') and not todo.changed('due_date'):
+        return
+    # A field whose loaded value is unknown was not changed.
+    before = (
+        todo.loaded_value('is_resolved', todo.is_resolved),
+        todo.loaded_value('due_date', todo.due_date),
+    )
+    after = _state(todo)
+    deltas = Counter()
+    _transition(deltas, before, after, timezone.localdate())
+    apply(deltas)
+
+
+def todo_deleted(todo):
+    deltas = Counter()
+    _transition(deltas, _state(todo), None, timezone.localdate())
+    apply(deltas)
+
+
+def bulk_before(queryset, values):
+    """Capture the states a bulk update may change."""
+    if 'is_resolved' not in values and 'due_date' not in values:
+        return None
+    return {
+        pk: (resolved, due_date)
+        for pk, resolved, due_date in queryset.values_list('pk', 'is_resolved', 'due_date')
+    }
+
+
+def bulk_after(before):
+    """Apply the transitions of every row a bulk update changed."""
+    if not before:
+        return
+    today = timezone.localdate()
+    deltas = Counter()
+    for pk, resolved, due_date in Todo.objects.filter(pk__in=list(before)).values_list(
+        'pk', 'is_resolved', 'due_date',
+    ):
+        if before[pk] != (resolved, due_date):
+            _transition(deltas, before[pk], (resolved, due_date), today)
+    apply(deltas)
+
+
+def rebuild(chunk_size=2000):
+    """
+    Recompute every rollup row from the current TODOs.
+
+    The TODO table has no resolution timestamps, so resolved TODOs count as
+    completed on their ``updated_at`` day, and deleted TODOs are not counted.
+    Returns the number of rows written.
+    """
+    deltas = Counter()
+    rows = Todo.objects.values_list('created_at', 'updated_at', 'is_resolved', 'due_date')
+    for created_at, updated_at, resolved, due_date in rows.iterator(chunk_size=chunk_size):
+        created = timezone.localdate(created_at)
+        _transition(deltas, None, (False, due_date), created)
+        if resolved:
+            _transition(deltas, (False, due_date), (True, due_date), max(created, timezone.localdate(updated_at)))
+
+    by_day = defaultdict(dict)
+    for (day, column), delta in deltas.items():
+        by_day[day][column] = delta
+    DailyRollup.objects.all().delete()
+    DailyRollup.objects.bulk_create(
+        [DailyRollup(day=day, **columns) for day, columns in sorted(by_day.items())],
+        batch_size=500,
+    )
+    return len(by_day)
+
+
+def series(days=365, today=None):
+    """
+    One entry per day for the ``days`` days up to ``today``, in one query.
+
+    The running sums are window functions over every rollup row up to
+    ``today``. Filtering on ``next_day`` (itself a window expression) is
+    applied after they are computed and keeps the rows in range plus the
+    last row before it, which carries the opening totals in.
+    """
+    if today is None:
+        today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    rows = (
+        DailyRollup.objects.filter(day__lte=today)
+        .annotate(
+            open_count=Window(Sum('open_delta'), order_by=F('day').asc()),
+            overdue_count=Window(Sum('overdue_delta'), order_by=F('day').asc()),
+            next_day=Window(Lead('day'), order_by=F('day').asc()),
+        )
+        .filter(Q(next_day__gt=start) | Q(next_day__isnull=True))
+        .values('day', *COUNTERS, 'open_count', 'overdue_count')
+        .order_by()
+    )
+    totals = {'open_count': 0, 'overdue_count': 0}
+    by_day = {}
+    for row in rows:
+        if row['day'] < start:
+            totals = {'open_count': row['open_count'], 'overdue_count': row['overdue_count']}
+        else:
+            by_day[row['day']] = row
+    result = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = by_day.get(day)
+        if row is not None:
+            totals = {'open_count': row['open_count'], 'overdue_count': row['overdue_count']}
+        result.append({
+            'day': day,
+            **{counter: row[counter] if row else 0 for counter in COUNTERS},
+            **totals,
+        })
+    return result
@@ -0,0 +1,135 @@
+"""
+JSON serialization for TODO listings.
+
+The fast path reads plain tuples through ``values_list`` and encodes them in a
+single loop, so no ``Todo`` instances are built. ``is_overdue`` is computed by
+the database. The output matches ``DjangoJSONEncoder`` applied to
+``todo_to_dict`` byte for byte, so both paths can be swapped freely.
+"""
+
+import json
+from json.encoder import encode_basestring_ascii
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import (
+    BooleanField, Case, CharField, ExpressionWrapper, F, IntegerField, Value, When,
+)
+from django.utils import timezone
+
+from .models import Todo
+
+TODO_FIELDS = (
+    'id', 'title', 'description', 'due_date',
+    'is_resolved', 'created_at', 'updated_at',
+)
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def overdue_expression(today=None, output_field=None):
+    """SQL expression equivalent to ``Todo.is_overdue()``."""
+    if today is None:
+        today = timezone.now().date()
+    return Case(
+        When(is_resolved=False, due_date__lt=today, then=Value(True)),
+        default=Value(False),
+        output_field=output_field or BooleanField(),
+    )
+
+
+def todo_to_dict(todo, today=None):
+    """Model-based representation of a TODO, used as the reference format."""
+    if today is None:
+        is_overdue = todo.is_overdue()
+    else:
+        is_overdue = not todo.is_resolved and todo.due_date is not None and todo.due_date < today
+    return {field: getattr(todo, field) for field in TODO_FIELDS} | {'is_overdue': is_overdue}
+
+
+def serialize_models(queryset):
+    """Serialize a queryset by instantiating every ``Todo`` (slow path)."""
+    return json.dumps(
+        [todo_to_dict(todo) for todo in queryset],
+        cls=DjangoJSONEncoder,
+    )
+
+
+def _encode_datetime(value):
+    # Same format as DjangoJSONEncoder: millisecond precision, 'Z' for UTC.
+    iso = value.isoformat()
+    if value.microsecond:
+        iso = iso[:23] + iso[26:]
+    if iso.endswith('+00:00'):
+        iso = iso[:-6] + 'Z'
+    elif value.tzinfo is None and settings.USE_TZ:
+        # Without the field converter SQLite returns naive values stored in UTC.
+        iso += 'Z'
+    return '"' + iso + '"'
+
+
+def todo_rows(queryset=None, today=None):
+    """
+    Return a ``values_list`` queryset of ``TODO_FIELDS`` plus ``is_overdue``.
+
+    Datetimes and booleans are selected without their model field types so the
+    backend's per-value Python converters (timezone handling, bool coercion)
+    are skipped; ``iter_json`` encodes the raw column values directly.
+    """
+    if queryset is None:
+        queryset = Todo.objects.all()
+    raw = {
+        'raw_is_resolved': ExpressionWrapper(F('is_resolved'), output_field=IntegerField()),
+        'raw_created_at': ExpressionWrapper(F('created_at'), output_field=CharField()),
+        'raw_updated_at': ExpressionWrapper(F('updated_at'), output_field=CharField()),
+        'raw_is_overdue': overdue_expression(today, output_field=IntegerField()),
+    }
+    return queryset.annotate(**raw).values_list(
+        'id', 'title', 'description', 'due_date',
+        'raw_is_resolved', 'raw_created_at', 'raw_updated_at', 'raw_is_overdue',
+    )
+
+
+def iter_json(queryset=None, chunk_size=DEFAULT_CHUNK_SIZE, today=None):
+    """
+    Yield a JSON array of TODOs as encoded chunks of ``chunk_size`` rows.
+
+    Rows are streamed from the database cursor, so memory use stays bounded
+    regardless of the size of the listing.
+    """
+    encode_str = encode_basestring_ascii
+    encode_dt = _encode_datetime
+    # Keys also match the 0/1 integers SQLite returns for booleans.
+    bools = {True: 'true', False: 'false'}
+    template = (
+        '{"id": %d, "title": %s, "description": %s, "due_date": %s, '
+        '"is_resolved": %s, "created_at": %s, "updated_at": %s, "is_overdue": %s}'
+    )
+
+    buffer = []
+    first = True
+    yield b'['
+    rows = todo_rows(queryset, today).iterator(chunk_size=chunk_size)
+    for pk, title, description, due_date, resolved, created, updated, overdue in rows:
+        buffer.append(template % (
+            pk,
+            encode_str(title),
+            'null' if description is None else encode_str(description),
+            'null' if due_date is None else '"' + due_date.isoformat() + '"',
+            bools[resolved],
+            encode_dt(created),
+            encode_dt(updated),
+            bools[overdue],
+        ))
+        if len(buffer) >= chunk_size:
+            yield (('' if first else ', ') + ', '.join(buffer)).encode()
+            first = False
+            buffer = []
+    if buffer:
+        yield (('' if first else ', ') + ', '.join(buffer)).encode()
+    yield b']'
+
+
+def serialize_rows(queryset=None, today=None):
+    """Serialize a queryset through the fast path into a single string."""
+    return b''.join(iter_json(queryset, today=today)).decode()
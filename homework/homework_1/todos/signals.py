@@ -0,0 +1,171 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import audit, cache, rollups, tagging, tasks, tree
+from .models import Todo
+from .querysets import post_bulk_update, pre_bulk_update
+from .taskqueue import enqueue
+
+
+@receiver(post_save, sender=Todo)
+def maintain_subtask_tree(sender, instance, created, **kwargs):
+    """Keep the closure table and ancestor resolution in step with saves."""
+    if created:
+        if instance.parent_id is not None:
+            tree.attach(instance)
+            # A new open subtask reopens its ancestors; a resolved one
+            # resolves nothing.
+            if not instance.is_resolved:
+                tree.roll_up_from(instance)
+        return
+    if instance.changed('parent_id'):
+        old_ancestors = list(tree.ancestor_ids(instance).values_list('ancestor_id', flat=True))
+        tree.move(instance)
+        if old_ancestors:
+            tree.roll_up(old_ancestors, resolved=True)
+        tree.roll_up_from(instance)
+    elif instance.changed('is_resolved'):
+        tree.roll_up_from(instance)
+
+
+@receiver(post_save, sender=Todo)
+def update_tag_counts(sender, instance, created, **kwargs):
+    """Move a TODO between its tags' open and closed counters."""
+    if not created and instance.changed('is_resolved'):
+        tagging.todo_resolution_changed(instance)
+
+
+@receiver(post_save, sender=Todo)
+def continue_recurrence(sender, instance, created, **kwargs):
+    """Resolving the last open occurrence stores the next one."""
+    if (
+        not created
+        and instance.recurrence_rule_id is not None
+        and instance.changed('is_resolved')
+        and instance.is_resolved
+    ):
+        rule_id = instance.recurrence_rule_id
+        enqueue(tasks.continue_recurrences, key=f'rule:{rule_id}', rule_id=rule_id)
+
+
+@receiver(m2m_changed, sender=Todo.tags.through)
+def update_tag_counts_on_link(sender, instance, action, reverse, pk_set, **kwargs):
+    tagging.todo_tags_changed(instance, action, reverse, pk_set)
+
+
+@receiver(post_save, sender=Todo)
+def audit_save(sender, instance, created, **kwargs):
+    audit.todo_saved(instance, created)
+
+
+@receiver(m2m_changed, sender=Todo.tags.through)
+def audit_tag_links(sender, instance, action, reverse, pk_set, **kwargs):
+    audit.todo_tags_changed(instance, action, reverse, pk_set)
+
+
+@receiver(post_save, sender=Todo)
+def update_rollups(sender, instance, created, **kwargs):
+    if created:
+        rollups.todo_created(instance)
+    else:
+        rollups.todo_changed(instance)
+
+
+@receiver(post_save, sender=Todo)
+def write_through_todo(sender, instance, **kwargs):
+    """
+    Keep the object cache in step with saved TODOs.
+
+    Connected after the other post_save receivers, which compare against the
+    loaded state that ``remember_state()`` resets here.
+    """
+    instance.remember_state()
+    cache.store(instance)
+
+
+@receiver(pre_delete, sender=Todo)
+def release_tag_counts(sender, instance, **kwargs):
+    """Links are removed by the cascade without m2m_changed, so count here."""
+    tagging.todo_deleted(instance)
+
+
+@receiver(pre_delete, sender=Todo)
+def remember_ancestors(sender, instance, **kwargs):
+    if instance.parent_id is not None and not instance.is_resolved:
+        instance._ancestor_ids = list(
+            tree.ancestor_ids(instance).values_list('ancestor_id', flat=True)
+        )
+
+
+@receiver(post_delete, sender=Todo)
+def evict_deleted_todo(sender, instance, **kwargs):
+    """Drop deleted TODOs from the object cache."""
+    cache.evict(instance.pk)
+
+
+@receiver(post_delete, sender=Todo)
+def audit_delete(sender, instance, **kwargs):
+    audit.todo_deleted(instance)
+
+
+@receiver(post_delete, sender=Todo)
+def update_rollups_after_delete(sender, instance, **kwargs):
+    rollups.todo_deleted(instance)
+
+
+@receiver(post_delete, sender=Todo)
+def roll_up_after_delete(sender, instance, **kwargs):
+    """Removing an open subtask may leave its ancestors fully resolved."""
+    ancestor_ids = getattr(instance, '_ancestor_ids', None)
+    if ancestor_ids:
+        tree.roll_up(ancestor_ids, resolved=True)
+
+
+@receiver(post_bulk_update, sender=Todo)
+def invalidate_after_bulk_update(sender, rows, **kwargs):
+    """Bulk updates cannot name the rows they touched; drop every cached TODO."""
+    if rows:
+        cache.bump_generation()
+
+
+@receiver(pre_bulk_update, sender=Todo)
+def remember_bulk_resolution(sender, queryset, values, state, **kwargs):
+    if 'is_resolved' in values:
+        state['tag_ids'] = tagging.tags_of(queryset)
+        state['rule_ids'] = list(
+            queryset.filter(recurrence_rule__isnull=False)
+            .values_list('recurrence_rule_id', flat=True)
+            .distinct()
+        )
+
+
+@receiver(post_bulk_update, sender=Todo)
+def recount_bulk_tags(sender, state, **kwargs):
+    if state.get('tag_ids'):
+        enqueue(tasks.recount_tags, tag_ids=state['tag_ids'])
+
+
+@receiver(post_bulk_update, sender=Todo)
+def continue_bulk_recurrence(sender, state, **kwargs):
+    for rule_id in state.get('rule_ids', ()):
+        enqueue(tasks.continue_recurrences, key=f'rule:{rule_id}', rule_id=rule_id)
+
+
+@receiver(pre_bulk_update, sender=Todo)
+def audit_bulk_before(sender, queryset, values, state, **kwargs):
+    state['audit'] = audit.bulk_before(queryset, values)
+
+
+@receiver(post_bulk_update, sender=Todo)
+def audit_bulk_after(sender, state, **kwargs):
+    audit.bulk_after(state.get('audit'))
+
+
+@receiver(pre_bulk_update, sender=Todo)
+def rollups_bulk_before(sender, queryset, values, state, **kwargs):
+    state['rollups'] = rollups.bulk_before(queryset, values)
+
+
+@receiver(post_bulk_update, sender=Todo)
+def rollups_bulk_after(sender, state, **kwargs):
+    rollups.bulk_after(state.get('rollups'))
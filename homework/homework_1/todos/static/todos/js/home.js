@@ -0,0 +1,61 @@
+document.querySelectorAll('.toggle-btn').forEach(btn => {
+    btn.addEventListener('click', function() {
+        const button = this;
+        const todoId = button.getAttribute('data-todo-id');
+        button.disabled = true;
+        
+        fetch(`/todos/${todoId}/toggle/`, {
+            method: 'POST',
+            headers: {
+                'X-CSRFToken': getCSRFToken(),
+                'Content-Type': 'application/json'
+            }
+        })
+        .then(response => response.json()
+            .catch(() => ({}))
+            .then(data => {
+                if (response.ok && data.success) {
+                    location.reload();
+                    return;
+                }
+                // Rate-limited (429) or shed (503) writes say when to retry.
+                const retryAfter = parseInt(response.headers.get('Retry-After'), 10) || 0;
+                showAlert(data.message || 'Could not update the TODO; please try again.');
+                setTimeout(() => { button.disabled = false; }, retryAfter * 1000);
+            }))
+        .catch(error => {
+            console.error('Error:', error);
+            showAlert('Could not reach the server; please try again.');
+            button.disabled = false;
+        });
+    });
+});
+
+function showAlert(message) {
+    const alert = document.createElement('div');
+    alert.className = 'alert alert-warning alert-dismissible fade show';
+    alert.setAttribute('role', 'alert');
+    alert.textContent = message;
+    const close = document.createElement('button');
+    close.type = 'button';
+    close.className = 'btn-close';
+    close.setAttribute('data-bs-dismiss', 'alert');
+    alert.appendChild(close);
+    document.querySelector('.container-main').prepend(alert);
+}
+
+function getCSRFToken() {
+    const name = 'csrftoken';
+    let cookieValue = null;
+    if (document.cookie && document.cookie !== '') {
+        const cookies = document.cookie.split(';');
+        for (let i = 0; i < cookies.length; i++) {
+            const cookie = cookies[i].trim();
+            if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                break;
+            }
+        }
+    }
+    return cookieValue;
+}
@@ -0,0 +1,138 @@
+"""
+Tag filters and incrementally maintained per-tag open/closed counters.
+
+Filters are driven from the ``tag_id`` index on the Todo/Tag link table, and
+the counters on ``Tag`` are adjusted by the exact number of links that
+changed, so neither ever scans the whole ``todos_todo`` table.
+"""
+
+from django.db.models import Count, F, Q
+
+from .models import Tag, Todo
+
+TodoTag = Todo.tags.through
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+
+
+def filter_by_tags(queryset, slugs, match=MATCH_ANY):
+    """
+    Restrict ``queryset`` to TODOs tagged with ``slugs``.
+
+    With ``match='any'`` a TODO needs one of the tags (OR), with
+    ``match='all'`` it needs every one of them (AND). Unknown slugs match
+    nothing.
+    """
+    slugs = list(dict.fromkeys(slug for slug in slugs if slug))
+    if not slugs:
+        return queryset
+    tag_ids = list(Tag.objects.filter(slug__in=slugs).values_list('pk', flat=True))
+    if match == MATCH_ALL:
+        if len(tag_ids) < len(slugs):
+            return queryset.none()
+        for tag_id in tag_ids:
+            queryset = queryset.filter(
+                pk__in=TodoTag.objects.filter(tag_id=tag_id).values('todo_id'),
+            )
+        return queryset
+    return queryset.filter(
+        pk__in=TodoTag.objects.filter(tag_id__in=tag_ids).values('todo_id'),
+    )
+
+
+def _counter(resolved):
+    return 'closed_count' if resolved else 'open_count'
+
+
+def _shift(tags, open_delta=0, closed_delta=0):
+    changes = {}
+    if open_delta:
+        changes['open_count'] = F('open_count') + open_delta
+    if closed_delta:
+        changes['closed_count'] = F('closed_count') + closed_delta
+    if changes:
+        tags.update(**changes)
+
+
+def _state_counts(todo_ids):
+    counts = Todo.objects.filter(pk__in=todo_ids).aggregate(
+        open=Count('pk', filter=Q(is_resolved=False)),
+        closed=Count('pk', filter=Q(is_resolved=True)),
+    )
+    return counts['open'], counts['closed']
+
+
+def todo_tags_changed(instance, action, reverse, pk_set):
+    """Apply an ``m2m_changed`` event on ``Todo.tags`` to the tag counters."""
+    if not reverse:
+        # ``instance`` is a Todo and ``pk_set`` holds tag ids.
+        if action == 'post_add' and pk_set:
+            field = _counter(instance.is_resolved)
+            Tag.objects.filter(pk__in=pk_set).update(**{field: F(field) + 1})
+        elif action in ('pre_remove', 'pre_clear'):
+            links = TodoTag.objects.filter(todo_id=instance.pk)
+            if action == 'pre_remove':
+                links = links.filter(tag_id__in=pk_set)
+            instance._removed_tag_ids = list(links.values_list('tag_id', flat=True))
+        elif action in ('post_remove', 'post_clear'):
+            removed = getattr(instance, '_removed_tag_ids', None)
+            if removed:
+                field = _counter(instance.is_resolved)
+                Tag.objects.filter(pk__in=removed).update(**{field: F(field) - 1})
+            instance._removed_tag_ids = None
+        return
+
+    # ``instance`` is a Tag and ``pk_set`` holds TODO ids.
+    tags = Tag.objects.filter(pk=instance.pk)
+    if action == 'post_add' and pk_set:
+        open_added, closed_added = _state_counts(pk_set)
+        _shift(tags, open_added, closed_added)
+    elif action == 'pre_remove':
+        present = TodoTag.objects.filter(tag_id=instance.pk, todo_id__in=pk_set).values('todo_id')
+        instance._removed_counts = _state_counts(present)
+    elif action == 'post_remove':
+        open_removed, closed_removed = getattr(instance, '_removed_counts', (0, 0))
+        _shift(tags, -open_removed, -closed_removed)
+        instance._removed_counts = None
+    elif action == 'post_clear':
+        tags.update(open_count=0, closed_count=0)
+
+
+def todo_resolution_changed(todo):
+    """Move ``todo`` between the open and closed counters of its tags."""
+    sign = 1 if todo.is_resolved else -1
+    _shift(Tag.objects.filter(todos=todo), open_delta=-sign, closed_delta=sign)
+
+
+def todo_deleted(todo):
+    """Remove ``todo`` from its tags' counters; call before its links go."""
+    field = _counter(todo.is_resolved)
+    Tag.objects.filter(todos=todo).update(**{field: F(field) - 1})
+
+
+def tags_of(queryset):
+    """Ids of the tags attached to any TODO in ``queryset``."""
+    return list(
+        TodoTag.objects.filter(todo_id__in=queryset.values('pk'))
+        .values_list('tag_id', flat=True)
+        .distinct()
+    )
+
+
+def recount(tag_ids):
+    """Recompute counters for ``tag_ids`` from their links (after bulk updates)."""
+    if not tag_ids:
+        return
+    counts = {
+        row['tag_id']: row
+        for row in TodoTag.objects.filter(tag_id__in=tag_ids).values('tag_id').annotate(
+            open=Count('pk', filter=Q(todo__is_resolved=False)),
+            closed=Count('pk', filter=Q(todo__is_resolved=True)),
+        )
+    }
+    tags = list(Tag.objects.filter(pk__in=tag_ids))
+    for tag in tags:
+        tag.open_count = counts.get(tag.pk, {}).get('open', 0)
+        tag.closed_count = counts.get(tag.pk, {}).get('closed', 0)
+    Tag.objects.bulk_update(tags, ['open_count', 'closed_count'])
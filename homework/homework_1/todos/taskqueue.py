@@ -0,0 +1,424 @@
+"""
+Small background task queue for side effects that need not hold up a request.
+
+Tasks are plain functions registered with ``@task``. ``enqueue()`` hands one
+to the backend selected by ``TASK_QUEUE_MODE``:
+
+``'thread'``
+    A process-local pool of ``TASK_QUEUE_WORKERS`` threads. Tasks are pushed
+    from ``transaction.on_commit`` so they never see uncommitted rows, and
+    whatever is still pending at interpreter exit is drained.
+``'database'``
+    A row in the ``Task`` table, written in the caller's transaction so a
+    rolled-back request leaves no task behind. ``manage.py run_worker``
+    claims and runs them, so queued work survives restarts.
+``'immediate'``
+    Runs the task inline and lets exceptions propagate (used by the tests).
+
+Tasks enqueued with the same ``key`` while one is still queued are dropped
+as duplicates. Tasks registered with ``batch=True`` receive a list of
+payloads and are called once for every group of queued tasks of that name.
+Failures are retried up to ``max_retries`` times with exponential backoff.
+"""
+
+import atexit
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+MODE_THREAD = 'thread'
+MODE_DATABASE = 'database'
+MODE_IMMEDIATE = 'immediate'
+
+registry = {}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def task(func=None, *, name=None, batch=False, max_retries=None):
+    """
+    Register ``func`` as a task.
+
+    Plain tasks are called with the keyword arguments given to ``enqueue``;
+    batch tasks are called with a list of those keyword-argument dicts.
+    """
+    def register(func):
+        func.task_name = name or f'{func.__module__}.{func.__name__}'
+        func.batch = batch
+        func.max_retries = (
+            _setting('TASK_QUEUE_MAX_RETRIES', 3) if max_retries is None else max_retries
+        )
+        registry[func.task_name] = func
+        return func
+    return register(func) if func is not None else register
+
+
+class QueueStats:
+    """Process-local counters and recent latencies for the task queue."""
+
+    def __init__(self, samples=1000):
+        self._lock = threading.Lock()
+        self._samples = samples
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.enqueued = self.deduplicated = self.succeeded = 0
+            self.retried = self.failed = self.batches = 0
+            # Seconds from enqueue to completion of each finished task.
+            self.latencies = deque(maxlen=self._samples)
+
+    def incr(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def finished(self, enqueued_at, count=1):
+        with self._lock:
+            self.latencies.extend([time.time() - enqueued_at] * count)
+
+
+stats = QueueStats()
+
+
+class Job:
+    """A task invocation held in memory by the thread backend."""
+
+    __slots__ = ('name', 'payload', 'key', 'attempts', 'enqueued_at')
+
+    def __init__(self, name, payload, key=None, attempts=0, enqueued_at=None):
+        self.name = name
+        self.payload = payload
+        self.key = key
+        self.attempts = attempts
+        self.enqueued_at = enqueued_at or time.time()
+
+
+def run(name, payloads):
+    """Run task ``name`` for ``payloads`` (one call per payload unless batched)."""
+    func = registry[name]
+    # A failed batch leaves nothing half-applied, so it can simply be retried.
+    with transaction.atomic():
+        if func.batch:
+            func(payloads)
+        else:
+            for payload in payloads:
+                func(**payload)
+    stats.incr('batches')
+
+
+def retry_delay(attempts):
+    """Backoff before attempt ``attempts + 1``."""
+    return _setting('TASK_QUEUE_RETRY_DELAY', 1.0) * 2 ** (attempts - 1)
+
+
+class ThreadQueue:
+    """In-memory queue served by a pool of daemon threads."""
+
+    def __init__(self, workers, batch_size):
+        self.workers = workers
+        self.batch_size = batch_size
+        self._ready = threading.Condition()
+        self._pending = deque()
+        self._keys = set()
+        self._active = 0
+        self._delayed = 0
+        self._threads = []
+
+    def depth(self):
+        with self._ready:
+            return len(self._pending)
+
+    def push(self, job):
+        with self._ready:
+            if job.key is not None:
+                if job.key in self._keys:
+                    stats.incr('deduplicated')
+                    return False
+                self._keys.add(job.key)
+            self._pending.append(job)
+            # ``wait()`` shares the condition, so wake every waiter.
+            self._ready.notify_all()
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._work, name=f'todos-task-{len(self._threads)}', daemon=True,
+                )
+                self._threads.append(thread)
+                thread.start()
+        return True
+
+    def _take(self):
+        with self._ready:
+            while not self._pending:
+                self._ready.wait()
+            first = self._pending.popleft()
+            jobs = [first]
+            if registry[first.name].batch:
+                rest = deque()
+                while self._pending:
+                    job = self._pending.popleft()
+                    if job.name == first.name and len(jobs) < self.batch_size:
+                        jobs.append(job)
+                    else:
+                        rest.append(job)
+                self._pending = rest
+            self._keys.difference_update(job.key for job in jobs if job.key is not None)
+            self._active += 1
+            return jobs
+
+    def _work(self):
+        while True:
+            jobs = self._take()
+            try:
+                close_old_connections()
+                run(jobs[0].name, [job.payload for job in jobs])
+            except Exception:
+                logger.exception("Task %s failed", jobs[0].name)
+                for job in jobs:
+                    self._retry(job)
+            else:
+                stats.incr('succeeded', len(jobs))
+                for job in jobs:
+                    stats.finished(job.enqueued_at)
+            finally:
+                close_old_connections()
+                with self._ready:
+                    self._active -= 1
+                    self._ready.notify_all()
+
+    def _retry(self, job):
+        job.attempts += 1
+        if job.attempts > registry[job.name].max_retries:
+            stats.incr('failed')
+            return
+        stats.incr('retried')
+        with self._ready:
+            self._delayed += 1
+        timer = threading.Timer(retry_delay(job.attempts), self._resubmit, [job])
+        timer.daemon = True
+        timer.start()
+
+    def _resubmit(self, job):
+        with self._ready:
+            self._delayed -= 1
+        self.push(job)
+
+    def wait(self, timeout=None):
+        """Block until nothing is pending, running or awaiting a retry."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._ready:
+            while self._pending or self._active or self._delayed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._ready.wait(remaining)
+            return True
+
+
+_thread_queue = None
+_thread_queue_lock = threading.Lock()
+
+
+def thread_queue():
+    global _thread_queue
+    with _thread_queue_lock:
+        if _thread_queue is None:
+            _thread_queue = ThreadQueue(
+                _setting('TASK_QUEUE_WORKERS', 2), _setting('TASK_QUEUE_BATCH_SIZE', 100),
+            )
+            atexit.register(_thread_queue.wait, _setting('TASK_QUEUE_SHUTDOWN_TIMEOUT', 10))
+        return _thread_queue
+
+
+def _store(name, payload, key):
+    if key is not None and Task.objects.filter(
+        name=name, dedup_key=key, status=Task.QUEUED,
+    ).exists():
+        return False
+    try:
+        # A savepoint keeps a lost dedup race from breaking the caller's
+        # transaction.
+        with transaction.atomic():
+            Task.objects.create(name=name, payload=payload, dedup_key=key)
+    except IntegrityError:
+        return False
+    return True
+
+
+def enqueue(func, key=None, **payload):
+    """
+    Queue ``func`` (a registered task or its name) with ``payload``.
+
+    ``payload`` must be JSON-serialisable. Returns False if the database
+    backend dropped the task as a duplicate of a queued one with the same
+    ``key``; the thread backend drops duplicates when the commit pushes them.
+    """
+    name = func if isinstance(func, str) else func.task_name
+    if name not in registry:
+        raise KeyError(f"Unknown task '{name}'")
+    mode = _setting('TASK_QUEUE_MODE', MODE_THREAD)
+    stats.incr('enqueued')
+    if mode == MODE_IMMEDIATE:
+        started = time.time()
+        run(name, [payload])
+        stats.incr('succeeded')
+        stats.finished(started)
+        return True
+    if mode == MODE_DATABASE:
+        queued = _store(name, payload, key)
+    elif mode == MODE_THREAD:
+        job = Job(name, payload, key)
+        transaction.on_commit(lambda: thread_queue().push(job))
+        return True
+    else:
+        raise ValueError(f"Unknown TASK_QUEUE_MODE '{mode}'")
+    if not queued:
+        stats.incr('deduplicated')
+    return queued
+
+
+def claim(batch_size=None, worker_id=None):
+    """
+    Claim up to ``batch_size`` due tasks from the table for this worker.
+
+    The claim is a conditional UPDATE stamped with a per-call token, so two
+    workers never run the same row even without row locks.
+    """
+    batch_size = batch_size or _setting('TASK_QUEUE_BATCH_SIZE', 100)
+    token = worker_id or uuid.uuid4().hex
+    now = timezone.now()
+    due = list(
+        Task.objects.filter(status=Task.QUEUED, run_after__lte=now)
+        .order_by('run_after', 'id')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    if not due:
+        return []
+    Task.objects.filter(pk__in=due, status=Task.QUEUED).update(
+        status=Task.RUNNING, claimed_by=token, started_at=now,
+    )
+    return list(Task.objects.filter(claimed_by=token, status=Task.RUNNING).order_by('id'))
+
+
+def _queued_twin():
+    # A queued task with the same name and dedup key, which would both
+    # violate the unique constraint on requeue and make the requeue redundant.
+    return Exists(Task.objects.filter(
+        status=Task.QUEUED, name=OuterRef('name'), dedup_key=OuterRef('dedup_key'),
+    ))
+
+
+def requeue_stale(lease=None):
+    """Return tasks claimed by a worker that died mid-run to the queue."""
+    lease = lease or _setting('TASK_QUEUE_LEASE_SECONDS', 300)
+    stale = Task.objects.filter(
+        status=Task.RUNNING, started_at__lt=timezone.now() - timedelta(seconds=lease),
+    )
+    stale.filter(_queued_twin()).delete()
+    return stale.update(status=Task.QUEUED, claimed_by='')
+
+
+def process(tasks):
+    """Run claimed ``Task`` rows, grouping batchable ones; return the count run."""
+    groups = {}
+    for row in tasks:
+        func = registry.get(row.name)
+        group = row.name if func is not None and func.batch else row.pk
+        groups.setdefault(group, []).append(row)
+
+    succeeded = 0
+    for rows in groups.values():
+        name = rows[0].name
+        try:
+            run(name, [row.payload for row in rows])
+        except Exception as exc:
+            logger.exception("Task %s failed", name)
+            _fail(rows, exc)
+            continue
+        Task.objects.filter(pk__in=[row.pk for row in rows]).delete()
+        stats.incr('succeeded', len(rows))
+        for row in rows:
+            stats.finished(row.enqueued_at.timestamp())
+        succeeded += len(rows)
+    return succeeded
+
+
+def _fail(rows, exc):
+    func = registry.get(rows[0].name)
+    max_retries = func.max_retries if func is not None else 0
+    now = timezone.now()
+    covered = Task.objects.filter(pk__in=[row.pk for row in rows]).filter(_queued_twin())
+    covered_ids = set(covered.values_list('pk', flat=True))
+    if covered_ids:
+        Task.objects.filter(pk__in=covered_ids).delete()
+        rows = [row for row in rows if row.pk not in covered_ids]
+    for row in rows:
+        row.attempts += 1
+        row.last_error = f'{type(exc).__name__}: {exc}'
+        row.claimed_by = ''
+        if row.attempts > max_retries:
+            row.status = Task.FAILED
+            stats.incr('failed')
+        else:
+            row.status = Task.QUEUED
+            row.run_after = now + timedelta(seconds=retry_delay(row.attempts))
+            stats.incr('retried')
+    Task.objects.bulk_update(rows, ['attempts', 'last_error', 'claimed_by', 'status', 'run_after'])
+
+
+def _percentile(sorted_values, percent):
+    # Nearest-rank percentile, as in the load-test report.
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+def table_stats():
+    """Depth, oldest queued task age and failed rows of the ``Task`` table."""
+    queued = Task.objects.filter(status=Task.QUEUED)
+    oldest = queued.order_by('enqueued_at').values_list('enqueued_at', flat=True).first()
+    return {
+        'depth': queued.count(),
+        'oldest_age_seconds': (
+            round((timezone.now() - oldest).total_seconds(), 3) if oldest else None
+        ),
+        'failed_rows': Task.objects.filter(status=Task.FAILED).count(),
+    }
+
+
+def queue_stats():
+    """Return depth, counters and enqueue-to-finish latency for the queue."""
+    mode = _setting('TASK_QUEUE_MODE', MODE_THREAD)
+    latencies = sorted(stats.latencies)
+    data = {
+        'mode': mode,
+        'enqueued': stats.enqueued,
+        'deduplicated': stats.deduplicated,
+        'succeeded': stats.succeeded,
+        'retried': stats.retried,
+        'failed': stats.failed,
+        'batches': stats.batches,
+        'latency_ms': {
+            'p50': round(_percentile(latencies, 50) * 1000, 3),
+            'p95': round(_percentile(latencies, 95) * 1000, 3),
+            'max': round(latencies[-1] * 1000, 3),
+        } if latencies else None,
+    }
+    if mode == MODE_THREAD:
+        data['depth'] = thread_queue().depth() if _thread_queue is not None else 0
+    elif mode == MODE_DATABASE:
+        data.update(table_stats())
+    return data
@@ -0,0 +1,43 @@
+"""
+Deferred side effects of TODO writes, run by the task queue.
+
+Each task recomputes from the current rows rather than applying a delta, so
+running one late, twice or as part of a batch gives the same result.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import recurrence, tagging
+from .taskqueue import enqueue, task
+
+
+@task(batch=True)
+def continue_recurrences(payloads):
+    """Store the next occurrence of rules left without an open one."""
+    recurrence.ensure_open_occurrence({payload['rule_id'] for payload in payloads})
+
+
+@task
+def materialize_recurrences():
+    """Store occurrences that have entered the rolling window."""
+    recurrence.materialize_due()
+
+
+def materialize_recurrences_soon():
+    """
+    Enqueue ``materialize_recurrences`` at most once per
+    ``RECURRENCE_MATERIALIZE_INTERVAL`` seconds.
+
+    The window moves on once a day, so busy pages need not enqueue it on
+    every request.
+    """
+    interval = getattr(settings, 'RECURRENCE_MATERIALIZE_INTERVAL', 60)
+    if cache.add('todos:materialize_recurrences', True, timeout=interval):
+        enqueue(materialize_recurrences, key='window')
+
+
+@task(batch=True)
+def recount_tags(payloads):
+    """Recompute tag counters after bulk resolution changes."""
+    tagging.recount({tag_id for payload in payloads for tag_id in payload['tag_ids']})
@@ -1,11 +1,38 @@
+import gzip
+import io
+import itertools
+import json
+import marshal
+import re
+import threading
+import time
+from pathlib import Path
+
 import pytest
+from django.contrib.auth.models import User
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.template.loader import get_template
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
-from datetime import datetime, timedelta
-from django.test import Client
-from django.urls import reverse
+from datetime import date, datetime, timedelta
+from django.test import Client, RequestFactory
+from django.http import JsonResponse
+from django.urls import resolve, reverse
 
-from todos.models import Todo
+from todos import (
+    assets, audit, cache as todo_cache, profiling, ratelimit, recurrence, rollups, taskqueue, tree,
+)
+from todos.models import AuditEntry, DailyRollup, RecurrenceRule, Tag, Task, Todo, TodoClosure
+from todos.filtering import SORT_FIELDS, STATUS_OPEN, STATUS_RESOLVED, filter_todos, parse_params
 from todos.forms import TodoForm
+from todos.loadtest import DEFAULT_MIX, build_report, parse_mix, run_worker
+from todos.profiling import sign_profile_header, store as profile_store
+from todos.serializers import iter_json, serialize_models, serialize_rows
+from todos.tagging import MATCH_ALL, filter_by_tags
 
 
 # ========================
@@ -557,3 +584,1599 @@ class TestTodoEdgeCases:
         
         todo.refresh_from_db()
         assert todo.updated_at > original_updated_at
+
+
+# ========================
+# Serializer Tests
+# ========================
+
+@pytest.mark.django_db
+class TestTodoSerializers:
+    """Test the values_list-based JSON serialization fast path."""
+    
+    def test_fast_path_matches_model_serialization(self):
+        """Test that both serializers produce identical JSON."""
+        today = timezone.now().date()
+        Todo.objects.create(title="Overdue", due_date=today - timedelta(days=2))
+        Todo.objects.create(title="Done", due_date=today - timedelta(days=2), is_resolved=True)
+        Todo.objects.create(title='Quotes "and" ünïcode', description="Line\nbreak")
+        Todo.objects.create(title="Future", due_date=today + timedelta(days=2))
+        
+        queryset = Todo.objects.all()
+        assert serialize_rows(queryset) == serialize_models(queryset)
+    
+    def test_is_overdue_computed_in_sql(self):
+        """Test that is_overdue comes from the database annotation."""
+        past_date = timezone.now().date() - timedelta(days=1)
+        Todo.objects.create(title="Overdue", due_date=past_date)
+        
+        data = json.loads(serialize_rows())
+        assert data[0]['is_overdue'] is True
+        assert data[0]['due_date'] == past_date.isoformat()
+    
+    def test_streams_in_chunks(self):
+        """Test that large listings are yielded in several chunks."""
+        Todo.objects.bulk_create(Todo(title=f"TODO {i}") for i in range(5))
+        
+        chunks = list(iter_json(chunk_size=2))
+        assert len(chunks) == 5  # '[', three row chunks, ']'
+        assert len(json.loads(b''.join(chunks))) == 5
+    
+    def test_empty_listing(self):
+        """Test serializing an empty table."""
+        assert serialize_rows() == '[]'
+    
+    def test_json_endpoint(self):
+        """Test the streaming JSON endpoint."""
+        Todo.objects.create(title="API TODO")
+        
+        response = Client().get(reverse('todo-list-json'))
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/json'
+        data = json.loads(b''.join(response.streaming_content))
+        assert data[0]['title'] == "API TODO"
+
+
+# ========================
+# Profiling Tests
+# ========================
+
+@pytest.mark.django_db
+class TestRequestProfiling:
+    """Test the sampling profiler middleware and its staff views."""
+    
+    def setup_method(self):
+        """Start each test with an empty profile store and a staff client."""
+        profile_store.clear()
+        self.client = Client()
+        staff = User.objects.create_user('staff', password='pass', is_staff=True)
+        self.staff_client = Client()
+        self.staff_client.force_login(staff)
+    
+    def test_unsampled_requests_are_not_profiled(self):
+        """Test that requests are skipped at the default sample rate."""
+        self.client.get(reverse('todo-list'))
+        assert profile_store.summary() == {}
+    
+    def test_invalid_header_is_ignored(self):
+        """Test that a forged profiling header does not trigger profiling."""
+        self.client.get(reverse('todo-list'), HTTP_X_PROFILE='profile:forged:sig')
+        assert profile_store.summary() == {}
+    
+    def test_signed_header_forces_profiling(self):
+        """Test that a signed header profiles the request under its URL name."""
+        token = sign_profile_header()
+        self.client.get(reverse('todo-list'), HTTP_X_PROFILE=token)
+        self.client.get(reverse('todo-list'), HTTP_X_PROFILE=token)
+        
+        summary = profile_store.summary()
+        assert summary['todo-list']['requests'] == 2
+    
+    def test_sample_rate(self, settings):
+        """Test that a sample rate of 1.0 profiles every request."""
+        settings.PROFILING_SAMPLE_RATE = 1.0
+        Client().get(reverse('todo-create'))
+        assert 'todo-create' in profile_store.summary()
+
+    def test_concurrent_request_runs_unprofiled(self, settings):
+        """Test that a request sampled while another is profiled is served unprofiled."""
+        settings.PROFILING_SAMPLE_RATE = 1.0
+        with profiling._profile_lock:
+            response = Client().get(reverse('todo-list'))
+        assert response.status_code == 200
+        assert profile_store.summary() == {}
+        
+        Client().get(reverse('todo-list'))
+        assert 'todo-list' in profile_store.summary()
+    
+    def test_dump_formats(self, settings):
+        """Test downloading collapsed stacks, pstats and allocation sites."""
+        settings.PROFILING_SAMPLE_RATE = 1.0
+        settings.PROFILING_STACK_INTERVAL = 0.0001
+        Client().get(reverse('todo-list'))
+        settings.PROFILING_SAMPLE_RATE = 0.0
+        url = reverse('profiling-dump', args=['todo-list'])
+        
+        collapsed = self.staff_client.get(url).content.decode()
+        lines = [line.rsplit(' ', 1) for line in collapsed.splitlines()]
+        assert any(';' in stack for stack, _ in lines)
+        assert all(int(weight) > 0 for _, weight in lines)
+        
+        dump = self.staff_client.get(url, {'format': 'pstats'}).content
+        assert marshal.loads(dump)
+        
+        allocations = self.staff_client.get(url, {'format': 'allocations'}).json()
+        assert allocations['url_name'] == 'todo-list'
+        assert isinstance(allocations['top_allocations'], list)
+    
+    def test_dump_unknown_url_name(self):
+        """Test that missing profiles return 404."""
+        response = self.staff_client.get(reverse('profiling-dump', args=['nope']))
+        assert response.status_code == 404
+    
+    def test_views_require_staff(self):
+        """Test that non-staff users are redirected to the admin login."""
+        response = self.client.get(reverse('profiling-index'))
+        assert response.status_code == 302
+        assert '/admin/login/' in response.url
+
+
+# ========================
+# Load Test Driver Tests
+# ========================
+
+class TestLoadTestDriver:
+    """Test the load-test mix parsing, driver and report."""
+    
+    def test_parse_mix(self):
+        """Test parsing operation weights."""
+        assert parse_mix('list=3, toggle=1') == {'list': 3, 'toggle': 1}
+    
+    @pytest.mark.parametrize('value', ['bogus=1', 'list=x', 'list=-1', 'list=0'])
+    def test_parse_mix_invalid(self, value):
+        """Test that invalid mixes are rejected."""
+        with pytest.raises(ValueError):
+            parse_mix(value)
+    
+    def test_build_report_percentiles(self):
+        """Test nearest-rank percentiles and error rates per operation."""
+        samples = [('list', i / 1000, i != 100) for i in range(1, 101)]
+        report = build_report(samples, elapsed=2.0, target='wsgi')
+        
+        endpoint = report['endpoints']['list']
+        assert report['target'] == 'wsgi'
+        assert report['throughput_rps'] == 50.0
+        assert endpoint['errors'] == 1
+        assert endpoint['error_rate'] == 0.01
+        assert endpoint['latency_ms']['p50'] == 50.0
+        assert endpoint['latency_ms']['p95'] == 95.0
+        assert endpoint['latency_ms']['p99'] == 99.0
+    
+    @pytest.mark.django_db
+    def test_run_worker_against_wsgi_app(self):
+        """Test that a worker drives every operation through the WSGI app."""
+        pks = [Todo.objects.create(title=f"TODO {i}").pk for i in range(20)]
+        samples = run_worker({
+            'worker': 0,
+            'mix': {name: 1 for name in DEFAULT_MIX},
+            'pks': pks,
+            'page_count': 2,
+            'requests': 60,
+            'deadline': float('inf'),
+            'base_url': None,
+            'seed': 0,
+        })
+        
+        assert len(samples) == 60
+        assert {operation for operation, _, _ in samples} == set(DEFAULT_MIX)
+        assert all(ok for _, _, ok in samples)
+        assert Todo.objects.filter(title__startswith="Load test").exists()
+
+
+# ========================
+# Object Cache Tests
+# ========================
+
+@pytest.mark.django_db
+class TestTodoObjectCache:
+    """Test the per-pk write-through cache behind Todo.cached."""
+    
+    @pytest.fixture
+    def commit(self, django_capture_on_commit_callbacks):
+        """Run an action and the on_commit callbacks that fill the cache."""
+        def run(action, *args, **kwargs):
+            with django_capture_on_commit_callbacks(execute=True):
+                return action(*args, **kwargs)
+        return run
+    
+    def test_miss_then_hit(self, commit, django_assert_num_queries):
+        """Test that the second lookup is served without a query."""
+        todo = Todo.objects.create(title="Cached")
+        todo_cache.evict(todo.pk)
+        
+        with django_assert_num_queries(1):
+            commit(Todo.cached.get, todo.pk)
+        with django_assert_num_queries(0):
+            assert Todo.cached.get(todo.pk).title == "Cached"
+        assert todo_cache.cache_stats()['misses'] == 1
+        assert todo_cache.cache_stats()['hits'] == 1
+    
+    def test_save_writes_through(self, commit, django_assert_num_queries):
+        """Test that saving refreshes the cached copy."""
+        todo = commit(Todo.objects.create, title="Before")
+        todo.title = "After"
+        commit(todo.save)
+        
+        with django_assert_num_queries(0):
+            assert Todo.cached.get(todo.pk).title == "After"
+    
+    def test_rolled_back_writes_never_reach_the_cache(self, commit):
+        """Test that saves and bulk updates are only cached once committed."""
+        todo = commit(Todo.objects.create, title="orig")
+        commit(Todo.cached.get, todo.pk)
+        
+        def rolled_back():
+            try:
+                with transaction.atomic():
+                    todo.title = "uncommitted"
+                    todo.save()
+                    Todo.objects.filter(pk=todo.pk).update(is_resolved=True)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        commit(rolled_back)
+        cached = commit(Todo.cached.get, todo.pk)
+        assert (cached.title, cached.is_resolved) == ("orig", False)
+    
+    def test_read_through_does_not_overwrite_a_fresher_write(self, commit, django_capture_on_commit_callbacks):
+        """Test that a fill read before a write-through, but landing after it, loses."""
+        todo = commit(Todo.objects.create, title="Fresh")
+        todo_cache.evict(todo.pk)
+        with django_capture_on_commit_callbacks() as fills:
+            assert Todo.cached.get(todo.pk).title == "Fresh"
+        
+        todo.title = "Fresher"
+        commit(todo.save)
+        for fill in fills:
+            fill()
+        assert Todo.cached.get(todo.pk).title == "Fresher"
+    
+    def test_bulk_update_invalidates(self):
+        """Test that queryset.update() does not leave stale entries."""
+        todo = Todo.objects.create(title="Open")
+        Todo.cached.get(todo.pk)
+        
+        Todo.objects.filter(pk=todo.pk).update(is_resolved=True)
+        assert Todo.cached.get(todo.pk).is_resolved is True
+    
+    def test_bulk_update_through_cached_manager_invalidates(self, commit):
+        """Test that Todo.cached querysets announce their bulk writes too."""
+        todo = commit(Todo.objects.create, title="Open")
+        todo.tags.add(Tag.objects.create(name="Work", slug="work"))
+        commit(Todo.cached.get, todo.pk)
+        
+        assert isinstance(Todo.cached.all(), type(Todo.objects.all()))
+        commit(Todo.cached.filter(pk=todo.pk).update, is_resolved=True)
+        assert Todo.cached.get(todo.pk).is_resolved is True
+        assert Tag.objects.values_list('open_count', 'closed_count').get() == (0, 1)
+    
+    def test_delete_evicts(self):
+        """Test that deleted TODOs are no longer served from the cache."""
+        todo = Todo.objects.create(title="Doomed")
+        pk = todo.pk
+        Todo.cached.get(pk)
+        
+        todo.delete()
+        with pytest.raises(Todo.DoesNotExist):
+            Todo.cached.get(pk)
+    
+    def test_queryset_delete_invalidates(self):
+        """Test that bulk deletes invalidate cached TODOs."""
+        todo = Todo.objects.create(title="Doomed")
+        Todo.cached.get(todo.pk)
+        
+        Todo.objects.all().delete()
+        with pytest.raises(Todo.DoesNotExist):
+            Todo.cached.get(todo.pk)
+    
+    def test_edit_view_uses_cache(self, commit):
+        """Test that repeated edit page loads hit the cache."""
+        todo = commit(Todo.objects.create, title="Edit me")
+        client = Client()
+        commit(client.get, reverse('todo-edit', args=[todo.pk]))
+        commit(client.get, reverse('todo-edit', args=[todo.pk]))
+        
+        assert todo_cache.cache_stats()['hits'] >= 2
+    
+    def test_toggle_writes_through(self):
+        """Test that toggling updates the cached TODO."""
+        todo = Todo.objects.create(title="Toggle")
+        Client().post(reverse('todo-toggle', args=[todo.pk]))
+        
+        assert Todo.cached.get(todo.pk).is_resolved is True
+    
+    def test_toggle_keeps_changes_the_cache_missed(self, commit):
+        """Test that a write made by another process is not overwritten from the cache."""
+        todo = commit(Todo.objects.create, title="Old")
+        commit(Todo.cached.get, todo.pk)
+        with connection.cursor() as cursor:
+            # Another process: no signal reaches this process's cache.
+            cursor.execute('UPDATE todos_todo SET title = %s WHERE id = %s', ["New", todo.pk])
+        assert Todo.cached.get(todo.pk).title == "Old"
+        
+        commit(Client().post, reverse('todo-toggle', args=[todo.pk]))
+        todo.refresh_from_db()
+        assert (todo.title, todo.is_resolved) == ("New", True)
+        assert Todo.cached.get(todo.pk).title == "New"
+    
+    def test_stats_report_lru_bounds(self, settings):
+        """Test that locmem size and bounds are reported."""
+        Todo.objects.create(title="Cached")
+        stats = todo_cache.cache_stats()
+        assert stats['max_entries'] == settings.CACHES['todos']['OPTIONS']['MAX_ENTRIES']
+        assert stats['entries'] >= 1
+    
+    def test_metrics_view(self):
+        """Test that staff can read the cache counters."""
+        staff = User.objects.create_user('staff', password='pass', is_staff=True)
+        client = Client()
+        client.force_login(staff)
+        
+        response = client.get(reverse('todo-metrics'))
+        assert response.status_code == 200
+        assert 'hits' in response.json()['todo_cache']
+
+
+# ========================
+# Subtask Tests
+# ========================
+
+@pytest.mark.django_db
+class TestSubtasks:
+    """Test nested TODOs backed by the closure table."""
+    
+    def make_tree(self):
+        """Create root -> child -> grandchild plus a second open child."""
+        root = Todo.objects.create(title="Root")
+        child = Todo.objects.create(title="Child", parent=root)
+        grandchild = Todo.objects.create(title="Grandchild", parent=child)
+        sibling = Todo.objects.create(title="Sibling", parent=root)
+        return root, child, grandchild, sibling
+    
+    def test_closure_rows(self):
+        """Test that every ancestor/descendant pair is recorded with its depth."""
+        root, child, grandchild, sibling = self.make_tree()
+        links = set(TodoClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+        assert links == {
+            (root.pk, child.pk, 1),
+            (root.pk, grandchild.pk, 2),
+            (root.pk, sibling.pk, 1),
+            (child.pk, grandchild.pk, 1),
+        }
+    
+    def test_subtree_queries(self, django_assert_num_queries):
+        """Test that subtree fetches and open counts are single queries."""
+        root, child, grandchild, sibling = self.make_tree()
+        with django_assert_num_queries(1):
+            assert set(tree.descendants(root)) == {child, grandchild, sibling}
+        with django_assert_num_queries(1):
+            assert tree.open_descendant_count(root) == 3
+    
+    def test_resolution_rolls_up(self):
+        """Test that resolving every leaf resolves all ancestors."""
+        root, child, grandchild, sibling = self.make_tree()
+        grandchild.is_resolved = True
+        grandchild.save()
+        child.refresh_from_db()
+        root.refresh_from_db()
+        assert child.is_resolved is True
+        assert root.is_resolved is False  # sibling is still open
+        
+        sibling.is_resolved = True
+        sibling.save()
+        root.refresh_from_db()
+        assert root.is_resolved is True
+    
+    def test_reopen_rolls_up(self):
+        """Test that reopening a leaf reopens resolved ancestors."""
+        root, child, grandchild, sibling = self.make_tree()
+        Client().post(reverse('todo-toggle', args=[grandchild.pk]))
+        Client().post(reverse('todo-toggle', args=[sibling.pk]))
+        assert Todo.cached.get(root.pk).is_resolved is True
+        
+        Client().post(reverse('todo-toggle', args=[grandchild.pk]))
+        assert Todo.cached.get(root.pk).is_resolved is False
+        assert Todo.cached.get(child.pk).is_resolved is False
+    
+    def test_move_subtree(self):
+        """Test that re-parenting relinks the whole subtree."""
+        root, child, grandchild, sibling = self.make_tree()
+        child.parent = sibling
+        child.save()
+        
+        assert tree.is_descendant(sibling, grandchild.pk)
+        assert TodoClosure.objects.get(ancestor=root, descendant=grandchild).depth == 3
+        assert set(tree.descendants(sibling)) == {child, grandchild}
+    
+    def test_delete_open_subtask_rolls_up(self):
+        """Test that deleting the last open subtask resolves its parent."""
+        root, child, grandchild, sibling = self.make_tree()
+        grandchild.is_resolved = True
+        grandchild.save()
+        
+        sibling.delete()
+        root.refresh_from_db()
+        assert root.is_resolved is True
+    
+    def test_removing_last_open_subtask_keeps_parent_open(self):
+        """Test that a parent left without subtasks is not marked done."""
+        parent = Todo.objects.create(title="Parent")
+        deleted = Todo.objects.create(title="Deleted", parent=parent)
+        deleted.delete()
+        parent.refresh_from_db()
+        assert parent.is_resolved is False
+        
+        moved = Todo.objects.create(title="Moved", parent=parent)
+        moved.parent = None
+        moved.save()
+        parent.refresh_from_db()
+        assert parent.is_resolved is False
+    
+    def test_resolved_first_subtask_keeps_parent_open(self):
+        """Test that adding an already resolved subtask does not resolve its parent."""
+        parent = Todo.objects.create(title="Parent")
+        Todo.objects.create(title="Done", parent=parent, is_resolved=True)
+        parent.refresh_from_db()
+        assert parent.is_resolved is False
+    
+    def test_form_rejects_cycles(self):
+        """Test that a TODO cannot be moved under its own subtask."""
+        root, child, grandchild, sibling = self.make_tree()
+        form = TodoForm(instance=child, data={'title': "Child", 'parent': grandchild.pk})
+        assert not form.is_valid()
+        assert 'parent' in form.errors
+
+    def test_admin_rejects_cycles(self, admin_client):
+        """Test that the admin form reports a cycle instead of failing on save."""
+        root, child, grandchild, sibling = self.make_tree()
+        response = admin_client.post(
+            reverse('admin:todos_todo_change', args=[child.pk]),
+            {'title': "Child", 'description': "", 'parent': grandchild.pk, 'due_date': ""},
+        )
+
+        assert response.status_code == 200
+        assert 'parent' in response.context['adminform'].form.errors
+        child.refresh_from_db()
+        assert child.parent_id == root.pk
+
+    def test_save_refuses_cycles(self):
+        """Test that direct saves never write a cycle into the closure table."""
+        root, child, grandchild, sibling = self.make_tree()
+        child.parent = child
+        with pytest.raises(ValueError):
+            child.save()
+        child.parent = grandchild
+        with pytest.raises(ValueError):
+            child.save()
+
+        assert not TodoClosure.objects.filter(ancestor=child, descendant=child, depth__gt=0).exists()
+        assert Todo.objects.get(pk=child.pk).parent_id == root.pk
+
+    def test_form_parent_is_a_raw_id(self):
+        """Test that the form does not list every TODO as a parent choice."""
+        root, child, grandchild, sibling = self.make_tree()
+        html = TodoForm(instance=child)['parent'].as_widget()
+
+        assert '<option' not in html
+        assert f'value="{root.pk}"' in html
+        assert TodoForm(instance=child, data={'title': "Child", 'parent': sibling.pk}).is_valid()
+
+    def test_list_renders_nested_subtasks(self):
+        """Test that only top-level TODOs are paginated and subtrees are prefetched."""
+        root, child, grandchild, sibling = self.make_tree()
+        response = Client().get(reverse('todo-list'))
+        
+        todos = response.context['todos']
+        assert [todo.pk for todo in todos] == [root.pk]
+        assert [todo.pk for todo in todos[0].subtasks] == [sibling.pk, child.pk]
+        assert todos[0].subtasks[1].subtasks == [grandchild]
+        assert todos[0].open_subtask_count == 3
+        assert "Grandchild" in response.content.decode()
+    
+    def test_list_query_count_independent_of_depth(self):
+        """Test that deeper trees do not add queries to the list page."""
+        self.make_tree()
+        client = Client()
+        # The first request also runs the (throttled) window check.
+        client.get(reverse('todo-list'))
+        with CaptureQueriesContext(connection) as shallow:
+            client.get(reverse('todo-list'))
+        
+        parent = Todo.objects.create(title="Deep root")
+        for i in range(5):
+            parent = Todo.objects.create(title=f"Level {i}", parent=parent)
+        with CaptureQueriesContext(connection) as deep:
+            client.get(reverse('todo-list'))
+        assert len(deep) == len(shallow)
+
+
+# ========================
+# Tag Tests
+# ========================
+
+@pytest.mark.django_db
+class TestTags:
+    """Test tags, tag filters and the per-tag counters."""
+    
+    def setup_method(self):
+        """Create two tags for each test."""
+        self.work = Tag.objects.create(name="Work", slug="work")
+        self.home = Tag.objects.create(name="Home", slug="home")
+    
+    def counts(self, tag):
+        """Return the stored (open, closed) counters of a tag."""
+        tag.refresh_from_db()
+        return tag.open_count, tag.closed_count
+    
+    def test_counters_follow_links(self):
+        """Test that adding, removing and clearing tags adjusts the counters."""
+        todo = Todo.objects.create(title="Report")
+        todo.tags.add(self.work, self.home)
+        assert self.counts(self.work) == (1, 0)
+        
+        todo.tags.remove(self.work)
+        todo.tags.remove(self.work)  # removing a missing link is a no-op
+        assert self.counts(self.work) == (0, 0)
+        
+        todo.tags.clear()
+        assert self.counts(self.home) == (0, 0)
+    
+    def test_counters_follow_reverse_links(self):
+        """Test adding and removing TODOs from the tag side."""
+        open_todo = Todo.objects.create(title="Open")
+        done_todo = Todo.objects.create(title="Done", is_resolved=True)
+        self.work.todos.add(open_todo, done_todo)
+        assert self.counts(self.work) == (1, 1)
+        
+        self.work.todos.remove(done_todo)
+        assert self.counts(self.work) == (1, 0)
+        
+        self.work.todos.clear()
+        assert self.counts(self.work) == (0, 0)
+    
+    def test_counters_follow_resolution_and_delete(self):
+        """Test that toggling and deleting TODOs moves their counts."""
+        todo = Todo.objects.create(title="Report")
+        todo.tags.add(self.work)
+        Client().post(reverse('todo-toggle', args=[todo.pk]))
+        assert self.counts(self.work) == (0, 1)
+        
+        todo.refresh_from_db()
+        todo.delete()
+        assert self.counts(self.work) == (0, 0)
+    
+    def test_counters_follow_bulk_update(self):
+        """Test that queryset.update() recounts the affected tags."""
+        for i in range(3):
+            Todo.objects.create(title=f"TODO {i}").tags.add(self.work)
+        
+        Todo.objects.filter(title__in=["TODO 0", "TODO 1"]).update(is_resolved=True)
+        assert self.counts(self.work) == (1, 2)
+    
+    def test_refresh_from_db_resets_loaded_state(self):
+        """Test that a refreshed TODO does not replay a change saved elsewhere."""
+        todo = Todo.objects.create(title="Report")
+        todo.tags.add(self.work)
+        other = Todo.objects.get(pk=todo.pk)
+        other.is_resolved = True
+        other.save()
+        
+        todo.refresh_from_db()
+        todo.title = "Quarterly report"
+        todo.save()
+        assert self.counts(self.work) == (0, 1)
+        assert DailyRollup.objects.get(day=timezone.localdate()).reopened == 0
+    
+    def test_deferred_fields_are_not_changes(self):
+        """Test that saving a partly loaded TODO leaves unloaded fields' state alone."""
+        todo = Todo.objects.create(title="Report", is_resolved=True)
+        todo.tags.add(self.work)
+        
+        partial = Todo.objects.only('id', 'title').get(pk=todo.pk)
+        partial.title = "Quarterly report"
+        partial.save()
+        assert self.counts(self.work) == (0, 1)
+        assert Todo.objects.get(pk=todo.pk).is_resolved is True
+        assert DailyRollup.objects.get(day=timezone.localdate()).reopened == 0
+    
+    def test_counters_follow_bulk_update_objects(self):
+        """Test that bulk_update() recounts the affected tags once."""
+        todos = [Todo.objects.create(title=f"TODO {i}") for i in range(3)]
+        for todo in todos:
+            todo.tags.add(self.work)
+            todo.is_resolved = True
+        
+        Todo.objects.bulk_update(todos[:2], ['is_resolved'])
+        assert self.counts(self.work) == (1, 2)
+    
+    def test_filter_any_and_all(self):
+        """Test OR and AND tag filters."""
+        both = Todo.objects.create(title="Both")
+        both.tags.add(self.work, self.home)
+        work = Todo.objects.create(title="Work only")
+        work.tags.add(self.work)
+        Todo.objects.create(title="Untagged")
+        
+        any_match = filter_by_tags(Todo.objects.all(), ['work', 'home'])
+        all_match = filter_by_tags(Todo.objects.all(), ['work', 'home'], MATCH_ALL)
+        assert set(any_match) == {both, work}
+        assert list(all_match) == [both]
+        assert not filter_by_tags(Todo.objects.all(), ['work', 'nope'], MATCH_ALL).exists()
+    
+    def test_list_view_tag_filter(self):
+        """Test the ?tag= and ?match= query parameters."""
+        root = Todo.objects.create(title="Root")
+        child = Todo.objects.create(title="Tagged child", parent=root)
+        child.tags.add(self.home)
+        
+        response = Client().get(reverse('todo-list'), {'tag': 'home'})
+        assert [todo.pk for todo in response.context['todos']] == [child.pk]
+        assert 'tag=home' in response.context['page_query']
+    
+    def test_form_saves_tags(self):
+        """Test that TodoForm edits the tags of a TODO."""
+        response = Client().post(reverse('todo-create'), {
+            'title': "Tagged",
+            'tags': [self.work.pk, self.home.pk],
+        })
+        assert response.status_code == 302
+        assert set(Todo.objects.get(title="Tagged").tags.all()) == {self.work, self.home}
+        assert self.counts(self.home) == (1, 0)
+    
+    def test_list_query_count_flat_across_page_sizes(self):
+        """Test that rendering tags costs a fixed number of queries per page."""
+        for i in range(100):
+            todo = Todo.objects.create(title=f"TODO {i}")
+            todo.tags.add(self.work, self.home)
+            Todo.objects.create(title=f"Subtask {i}", parent=todo).tags.add(self.work)
+        client = Client()
+        # The first request also runs the (throttled) window check.
+        client.get(reverse('todo-list'))
+        
+        with CaptureQueriesContext(connection) as small_page:
+            response = client.get(reverse('todo-list'), {'per_page': 10})
+        assert len(response.context['todos']) == 10
+        with CaptureQueriesContext(connection) as large_page:
+            response = client.get(reverse('todo-list'), {'per_page': 100})
+        assert len(response.context['todos']) == 100
+        assert len(large_page) == len(small_page)
+
+
+# ========================
+# Recurrence Tests
+# ========================
+
+@pytest.mark.django_db
+class TestRecurrence:
+    """Test cases for recurring TODOs."""
+    
+    def make_rule(self, frequency, start, **kwargs):
+        template = Todo.objects.create(title="Recurring", due_date=start)
+        return recurrence.start(template, frequency, **kwargs)
+    
+    def test_occurrence_dates(self):
+        """Test date math for each frequency, including month-end clamping."""
+        rule = RecurrenceRule(frequency=RecurrenceRule.MONTHLY, interval=1, start_date=date(2024, 1, 31))
+        assert [rule.occurrence_date(i) for i in range(4)] == [
+            date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30),
+        ]
+        rule = RecurrenceRule(frequency=RecurrenceRule.WEEKLY, interval=2, start_date=date(2024, 1, 1))
+        assert rule.occurrence_date(3) == date(2024, 2, 12)
+        assert rule.describe() == "every 2 weeks"
+        rule = RecurrenceRule(frequency=RecurrenceRule.DAILY, interval=1, start_date=date(2024, 1, 1))
+        assert rule.occurrence_date(366) == date(2025, 1, 1)
+    
+    def test_end_conditions(self):
+        """Test that until and max_occurrences end the series."""
+        rule = RecurrenceRule(
+            frequency=RecurrenceRule.DAILY, interval=1,
+            start_date=date(2024, 1, 1), until=date(2024, 1, 3),
+        )
+        assert rule.occurrence_date(2) == date(2024, 1, 3)
+        assert rule.occurrence_date(3) is None
+        rule = RecurrenceRule(
+            frequency=RecurrenceRule.DAILY, interval=1,
+            start_date=date(2024, 1, 1), max_occurrences=2,
+        )
+        assert rule.occurrence_date(1) is not None
+        assert rule.occurrence_date(2) is None
+        assert rule.upcoming(5) == [date(2024, 1, 2)]
+    
+    def test_only_window_is_stored(self):
+        """Test that only occurrences inside the window become rows."""
+        today = timezone.now().date()
+        rule = self.make_rule(RecurrenceRule.DAILY, today)
+        # The template plus RECURRENCE_WINDOW_DAYS more days.
+        assert rule.occurrences.count() == 8
+        assert rule.next_date == today + timedelta(days=8)
+        assert rule.upcoming(2) == [today + timedelta(days=8), today + timedelta(days=9)]
+        
+        # Nothing new is stored until the window moves on.
+        assert recurrence.materialize_due(today) == []
+        created = recurrence.materialize_due(today + timedelta(days=2))
+        assert [todo.due_date for todo in created] == [
+            today + timedelta(days=8), today + timedelta(days=9),
+        ]
+    
+    def test_storage_stays_bounded(self):
+        """Test that a long-running rule stores only its window."""
+        today = timezone.now().date()
+        rule = self.make_rule(RecurrenceRule.MONTHLY, today)
+        assert rule.occurrences.count() == 1
+        for _ in range(5):
+            recurrence.materialize_due(today)
+        assert rule.occurrences.count() == 1
+        assert len(rule.upcoming(12)) == 12
+    
+    def test_resolving_last_open_occurrence_stores_next(self):
+        """Test that resolving the only open occurrence stores the next one."""
+        today = timezone.now().date()
+        rule = self.make_rule(RecurrenceRule.WEEKLY, today, max_occurrences=2)
+        template = rule.template
+        template.is_resolved = True
+        template.save()
+        
+        occurrences = list(rule.occurrences.order_by('due_date'))
+        assert [todo.due_date for todo in occurrences] == [today, today + timedelta(weeks=1)]
+        assert occurrences[1].is_resolved is False
+        
+        # The series has ended, so resolving the last one stores nothing.
+        Todo.objects.filter(pk=occurrences[1].pk).update(is_resolved=True)
+        assert rule.occurrences.count() == 2
+    
+    def test_bulk_resolve_stores_next(self):
+        """Test that bulk updates continue the series too."""
+        today = timezone.now().date()
+        rule = self.make_rule(RecurrenceRule.MONTHLY, today)
+        Todo.objects.filter(recurrence_rule=rule).update(is_resolved=True)
+        assert rule.occurrences.filter(is_resolved=False).count() == 1
+    
+    def test_occurrences_copy_tags(self):
+        """Test that occurrences copy the template's tags."""
+        tag = Tag.objects.create(name="Chores", slug="chores")
+        template = Todo.objects.create(title="Water plants", due_date=timezone.now().date())
+        template.tags.add(tag)
+        recurrence.start(template, RecurrenceRule.DAILY, interval=7)
+        tag.refresh_from_db()
+        assert (tag.open_count, tag.closed_count) == (2, 0)
+    
+    def test_form_creates_and_stops_rule(self):
+        """Test creating a recurring TODO through the form and clearing it."""
+        today = timezone.now().date()
+        client = Client()
+        response = client.post(reverse('todo-create'), {
+            'title': "Standup",
+            'due_date': today.isoformat(),
+            'repeat': RecurrenceRule.DAILY,
+            'repeat_interval': 1,
+            'repeat_count': 3,
+        })
+        assert response.status_code == 302
+        template = Todo.objects.get(title="Standup", recurrence__isnull=False)
+        assert Todo.objects.filter(title="Standup").count() == 3
+        
+        form = TodoForm(instance=Todo.objects.exclude(pk=template.pk).filter(title="Standup").first())
+        assert 'repeat' not in form.fields
+        
+        client.post(reverse('todo-edit', args=[template.pk]), {
+            'title': "Standup",
+            'due_date': today.isoformat(),
+            'repeat': '',
+        })
+        assert not RecurrenceRule.objects.exists()
+        assert Todo.cached.get(template.pk).recurrence_rule_id is None
+        assert Todo.objects.filter(title="Standup").count() == 3
+    
+    def test_form_requires_due_date(self):
+        """Test that a repeating TODO needs a due date."""
+        form = TodoForm(data={'title': "No date", 'repeat': RecurrenceRule.WEEKLY})
+        assert not form.is_valid()
+        assert 'due_date' in form.errors
+    
+    def test_list_view_shows_schedule(self):
+        """Test the repeat badge and upcoming dates on the list page."""
+        self.make_rule(RecurrenceRule.MONTHLY, timezone.now().date())
+        response = Client().get(reverse('todo-list'))
+        assert 'Repeats monthly' in response.content.decode()
+        assert 'Next:' in response.content.decode()
+
+
+# ========================
+# Filter and Sort Tests
+# ========================
+
+@pytest.mark.django_db
+class TestListFiltering:
+    """Test cases for list filters, sort keys and their query plans."""
+    
+    def test_status_overdue_and_range(self):
+        """Test each filter on its own."""
+        today = timezone.now().date()
+        late = Todo.objects.create(title="Late", due_date=today - timedelta(days=2))
+        soon = Todo.objects.create(title="Soon", due_date=today + timedelta(days=2))
+        done = Todo.objects.create(title="Done", due_date=today - timedelta(days=2), is_resolved=True)
+        Todo.objects.create(title="Undated")
+        todos = Todo.objects.all()
+        
+        assert set(filter_todos(todos, status=STATUS_RESOLVED)) == {done}
+        assert list(filter_todos(todos, overdue=True)) == [late]
+        assert not filter_todos(todos, status=STATUS_RESOLVED, overdue=True).exists()
+        assert set(filter_todos(todos, due_after=today - timedelta(days=2), due_before=today)) == {late, done}
+        assert list(filter_todos(todos, status=STATUS_OPEN, due_after=today)) == [soon]
+    
+    def test_sort_ties_are_stable_across_pages(self):
+        """Test that equal sort keys are ordered by id in the sort direction."""
+        for i in range(6):
+            Todo.objects.create(title="Same")
+        ascending = list(filter_todos(Todo.objects.all(), sort='title').values_list('pk', flat=True))
+        descending = list(filter_todos(Todo.objects.all(), sort='-title').values_list('pk', flat=True))
+        assert ascending == sorted(ascending)
+        assert descending == ascending[::-1]
+        
+        client = Client()
+        pages = [
+            [todo.pk for todo in client.get(reverse('todo-list'), {
+                'sort': 'title', 'per_page': 4, 'page': page,
+            }).context['todos']]
+            for page in (1, 2)
+        ]
+        assert pages[0] + pages[1] == ascending
+    
+    def test_parse_params_ignores_bad_values(self):
+        """Test that unknown or malformed parameters fall back to defaults."""
+        params = parse_params({
+            'status': 'bogus', 'overdue': 'no', 'due_after': '2024-02-30',
+            'due_before': 'soon', 'sort': '-color',
+        })
+        assert params == {
+            'status': None, 'overdue': False, 'due_after': None,
+            'due_before': None, 'sort': '-created',
+        }
+        assert parse_params({'sort': '-due', 'due_after': '2024-01-31'})['due_after'] == date(2024, 1, 31)
+    
+    def test_list_view_applies_filters(self):
+        """Test the list view query parameters."""
+        Todo.objects.create(title="B open", due_date=timezone.now().date())
+        Todo.objects.create(title="A open")
+        Todo.objects.create(title="C done", is_resolved=True)
+        response = Client().get(reverse('todo-list'), {'status': 'open', 'sort': 'title'})
+        assert [todo.title for todo in response.context['todos']] == ["A open", "B open"]
+        assert response.context['filters']['sort'] == 'title'
+        assert 'status=open' in response.context['page_query']
+    
+    def test_every_combination_uses_an_index(self):
+        """Test EXPLAIN QUERY PLAN for every filter/sort combination."""
+        def plan(queryset):
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                return [row[-1] for row in cursor.fetchall()]
+        
+        combinations = itertools.product(
+            (None, STATUS_OPEN, STATUS_RESOLVED),
+            (False, True),
+            (None, date(2024, 1, 1)),
+            (None, date(2024, 12, 31)),
+            [prefix + key for key in SORT_FIELDS for prefix in ('', '-')],
+        )
+        checked = 0
+        for status, overdue, due_after, due_before, sort in combinations:
+            if overdue and status == STATUS_RESOLVED:
+                continue
+            queryset = filter_todos(
+                Todo.objects.filter(parent__isnull=True),
+                status=status, overdue=overdue, due_after=due_after,
+                due_before=due_before, sort=sort,
+            )[:10]
+            steps = plan(queryset)
+            context = (status, overdue, due_after, due_before, sort, steps)
+            # One search of a list index; never a full table scan.
+            assert len([step for step in steps if 'todos_todo' in step]) == 1, context
+            assert steps[0].startswith('SEARCH todos_todo USING INDEX todo_list_'), context
+            assert 'parent_id=?' in steps[0], context
+            sorted_by_index = not any('TEMP B-TREE' in step for step in steps)
+            if due_after or due_before or overdue:
+                # Either walk the sort index or narrow by due date and sort
+                # only the rows in that range.
+                assert sorted_by_index or 'due_date' in steps[0], context
+            else:
+                assert sorted_by_index, context
+                if status is not None:
+                    assert 'is_resolved=?' in steps[0], context
+            checked += 1
+        assert checked == 160
+
+
+# ========================
+# Task Queue Tests
+# ========================
+
+calls = []
+
+
+@taskqueue.task(name='tests.record')
+def record_task(value):
+    calls.append(value)
+
+
+@taskqueue.task(name='tests.record_batch', batch=True)
+def record_batch_task(payloads):
+    calls.append(sorted(payload['value'] for payload in payloads))
+
+
+@taskqueue.task(name='tests.flaky', max_retries=1)
+def flaky_task(fail_times):
+    calls.append('attempt')
+    if calls.count('attempt') <= fail_times:
+        raise RuntimeError("flaky")
+
+
+@pytest.fixture
+def task_calls():
+    calls.clear()
+    yield calls
+    calls.clear()
+
+
+@pytest.mark.django_db
+class TestThreadTaskQueue:
+    """Test cases for the in-process thread backend."""
+    
+    def test_dedup_and_batching_while_busy(self, task_calls):
+        """Test that queued duplicates are dropped and similar tasks batched."""
+        queue = taskqueue.ThreadQueue(workers=1, batch_size=10)
+        release = threading.Event()
+        started = threading.Event()
+        
+        @taskqueue.task(name='tests.block')
+        def block():
+            started.set()
+            release.wait(5)
+        
+        queue.push(taskqueue.Job('tests.block', {}))
+        assert started.wait(5)
+        assert queue.push(taskqueue.Job('tests.record', {'value': 1}, key='one'))
+        assert not queue.push(taskqueue.Job('tests.record', {'value': 1}, key='one'))
+        for value in (3, 2, 1):
+            queue.push(taskqueue.Job('tests.record_batch', {'value': value}))
+        assert queue.depth() == 4
+        release.set()
+        assert queue.wait(5)
+        assert task_calls == [1, [1, 2, 3]]
+    
+    def test_retries_with_backoff(self, task_calls, settings):
+        """Test that a failing task is retried until it succeeds."""
+        settings.TASK_QUEUE_RETRY_DELAY = 0.01
+        queue = taskqueue.ThreadQueue(workers=1, batch_size=10)
+        queue.push(taskqueue.Job('tests.flaky', {'fail_times': 1}))
+        assert queue.wait(5)
+        assert task_calls == ['attempt', 'attempt']
+        assert taskqueue.stats.retried == 1
+        assert taskqueue.stats.succeeded == 1
+    
+    def test_gives_up_after_max_retries(self, task_calls, settings):
+        """Test that a task failing every time is dropped and counted."""
+        settings.TASK_QUEUE_RETRY_DELAY = 0.01
+        queue = taskqueue.ThreadQueue(workers=1, batch_size=10)
+        queue.push(taskqueue.Job('tests.flaky', {'fail_times': 5}))
+        assert queue.wait(5)
+        assert task_calls == ['attempt', 'attempt']
+        assert taskqueue.stats.failed == 1
+    
+    def test_enqueue_waits_for_commit(self, task_calls, settings, django_capture_on_commit_callbacks):
+        """Test that thread-mode tasks are only pushed once the transaction commits."""
+        settings.TASK_QUEUE_MODE = taskqueue.MODE_THREAD
+        with django_capture_on_commit_callbacks() as callbacks:
+            taskqueue.enqueue(record_task, value='committed')
+            assert task_calls == []
+        assert len(callbacks) == 1
+        callbacks[0]()
+        assert taskqueue.thread_queue().wait(5)
+        assert task_calls == ['committed']
+
+
+@pytest.mark.django_db
+class TestDatabaseTaskQueue:
+    """Test cases for the Task table backend and run_worker."""
+    
+    @pytest.fixture(autouse=True)
+    def database_mode(self, settings):
+        settings.TASK_QUEUE_MODE = taskqueue.MODE_DATABASE
+    
+    def test_enqueue_deduplicates_queued_keys(self):
+        """Test that one queued task per key is stored."""
+        assert taskqueue.enqueue(record_task, key='k', value=1)
+        assert not taskqueue.enqueue(record_task, key='k', value=2)
+        assert taskqueue.enqueue(record_task, value=3)
+        assert Task.objects.count() == 2
+        assert taskqueue.queue_stats()['depth'] == 2
+        assert taskqueue.stats.deduplicated == 1
+    
+    def test_rolled_back_enqueue_leaves_no_task(self):
+        """Test that a task is stored in the caller's transaction."""
+        try:
+            with transaction.atomic():
+                taskqueue.enqueue(record_task, value=1)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        assert not Task.objects.exists()
+    
+    def test_claim_and_process_batches(self, task_calls):
+        """Test that claimed batch tasks run as one call and are removed."""
+        for value in (2, 1):
+            taskqueue.enqueue(record_batch_task, value=value)
+        taskqueue.enqueue(record_task, value='single')
+        claimed = taskqueue.claim()
+        assert len(claimed) == 3
+        assert not taskqueue.claim()
+        assert taskqueue.process(claimed) == 3
+        assert task_calls == [[1, 2], 'single']
+        assert not Task.objects.exists()
+    
+    def test_failed_task_is_retried_then_kept(self, task_calls):
+        """Test retry scheduling and the final failed state."""
+        taskqueue.enqueue(flaky_task, fail_times=5)
+        taskqueue.process(taskqueue.claim())
+        task = Task.objects.get()
+        assert (task.status, task.attempts) == (Task.QUEUED, 1)
+        assert task.run_after > timezone.now()
+        assert 'RuntimeError: flaky' in task.last_error
+        assert not taskqueue.claim()
+        
+        Task.objects.update(run_after=timezone.now())
+        taskqueue.process(taskqueue.claim())
+        assert Task.objects.get().status == Task.FAILED
+        assert taskqueue.queue_stats()['failed_rows'] == 1
+    
+    def test_requeue_stale_tasks(self):
+        """Test that tasks claimed by a dead worker are queued again."""
+        taskqueue.enqueue(record_task, key='k', value=1)
+        taskqueue.claim()
+        Task.objects.update(started_at=timezone.now() - timedelta(hours=1))
+        taskqueue.enqueue(record_task, key='other', value=2)
+        assert taskqueue.requeue_stale(lease=60) == 1
+        assert Task.objects.filter(status=Task.QUEUED).count() == 2
+    
+    def test_run_worker_once(self, task_calls):
+        """Test that manage.py run_worker --once drains the queue."""
+        taskqueue.enqueue(record_task, value='from worker')
+        out = io.StringIO()
+        call_command('run_worker', '--once', stdout=out, stderr=io.StringIO())
+        assert task_calls == ['from worker']
+        assert 'Processed 1 task(s)' in out.getvalue()
+        assert not Task.objects.exists()
+    
+    def test_views_enqueue_side_effects(self):
+        """Test that the list view and resolving occurrences enqueue tasks."""
+        today = timezone.now().date()
+        template = Todo.objects.create(title="Daily", due_date=today)
+        rule = recurrence.start(template, RecurrenceRule.MONTHLY)
+        client = Client()
+        client.get(reverse('todo-list'))
+        client.get(reverse('todo-list'))
+        client.post(reverse('todo-toggle', args=[template.pk]))
+        assert sorted(Task.objects.values_list('name', 'dedup_key')) == [
+            ('todos.tasks.continue_recurrences', f'rule:{rule.pk}'),
+            ('todos.tasks.materialize_recurrences', 'window'),
+        ]
+        assert rule.occurrences.count() == 1
+        
+        taskqueue.process(taskqueue.claim())
+        assert rule.occurrences.filter(is_resolved=False).count() == 1
+    
+    def test_list_view_throttles_materialization(self):
+        """Test that the list view enqueues the window check at most once per interval."""
+        client = Client()
+        client.get(reverse('todo-list'))
+        assert Task.objects.filter(name='todos.tasks.materialize_recurrences').delete()[0] == 1
+        
+        client.get(reverse('todo-list'))
+        assert not Task.objects.exists()
+        
+        cache.clear()
+        client.get(reverse('todo-list'))
+        assert Task.objects.filter(name='todos.tasks.materialize_recurrences').count() == 1
+    
+    def test_metrics_include_queue(self):
+        """Test that the metrics view reports queue depth and latency."""
+        User.objects.create_user('staff', password='pw', is_staff=True)
+        client = Client()
+        client.login(username='staff', password='pw')
+        taskqueue.enqueue(record_task, value=1)
+        data = client.get(reverse('todo-metrics')).json()['task_queue']
+        assert data['mode'] == 'database'
+        assert data['depth'] == 1
+        assert data['oldest_age_seconds'] is not None
+
+
+# ========================
+# Audit Log Tests
+# ========================
+
+@pytest.mark.django_db
+class TestAuditLog:
+    """Test cases for the buffered audit trail."""
+    
+    @pytest.fixture
+    def commit(self, django_capture_on_commit_callbacks):
+        """Run on_commit callbacks, then flush the audit buffer."""
+        def run(action, *args, **kwargs):
+            with django_capture_on_commit_callbacks(execute=True):
+                result = action(*args, **kwargs)
+            audit.buffer.flush()
+            return result
+        return run
+    
+    def test_update_view_records_diff_and_actor(self, commit):
+        """Test that editing through the view records changed fields and the user."""
+        User.objects.create_user('alice', password='pw')
+        client = Client()
+        client.login(username='alice', password='pw')
+        todo = commit(Todo.objects.create, title="Old", description="Same")
+        commit(client.post, reverse('todo-edit', args=[todo.pk]), {
+            'title': "New", 'description': "Same",
+        })
+        entry = AuditEntry.objects.get(action=AuditEntry.UPDATE)
+        assert entry.changes == {'title': ["Old", "New"]}
+        assert entry.actor == 'alice'
+        assert entry.source == 'POST ' + reverse('todo-edit', args=[todo.pk])
+        assert entry.month == audit.month_key(entry.created_at)
+    
+    def test_toggle_bulk_and_delete(self, commit):
+        """Test entries for toggles, bulk updates, tag links and deletes."""
+        todo = commit(Todo.objects.create, title="Audited")
+        other = commit(Todo.objects.create, title="Already done", is_resolved=True)
+        tag = Tag.objects.create(name="Work", slug="work")
+        commit(Client().post, reverse('todo-toggle', args=[todo.pk]))
+        commit(Todo.objects.filter(pk__in=[todo.pk, other.pk]).update, is_resolved=False)
+        commit(todo.tags.add, tag)
+        todo_id = todo.pk
+        commit(todo.delete)
+        
+        entries = [(entry.action, entry.changes) for entry in audit.history(todo_id).reverse()]
+        assert entries == [
+            (AuditEntry.CREATE, {'title': [None, "Audited"], 'is_resolved': [None, False]}),
+            (AuditEntry.UPDATE, {'is_resolved': [False, True]}),
+            (AuditEntry.BULK_UPDATE, {'is_resolved': [True, False]}),
+            (AuditEntry.UPDATE, {'tags': {'added': [tag.pk]}}),
+            (AuditEntry.DELETE, {'title': ["Audited", None], 'is_resolved': [False, None]}),
+        ]
+        assert list(audit.history(other.pk).values_list('action', flat=True)) == [
+            AuditEntry.BULK_UPDATE, AuditEntry.CREATE,
+        ]
+    
+    def test_bulk_update_objects_records_once(self, commit):
+        """Test that bulk_update() records one entry per changed row."""
+        todos = [commit(Todo.objects.create, title=f"TODO {i}") for i in range(3)]
+        for todo in todos:
+            todo.is_resolved = True
+        todos[2].is_resolved = False
+        commit(Todo.objects.bulk_update, todos, ['is_resolved'], batch_size=2)
+        
+        entries = AuditEntry.objects.filter(action=AuditEntry.BULK_UPDATE)
+        assert sorted(entries.values_list('todo_id', flat=True)) == [todos[0].pk, todos[1].pk]
+        assert all(entry.changes == {'is_resolved': [False, True]} for entry in entries)
+    
+    def test_rolled_back_changes_are_not_recorded(self, commit):
+        """Test that entries are only buffered once their transaction commits."""
+        def rolled_back():
+            try:
+                with transaction.atomic():
+                    Todo.objects.create(title="Never")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        commit(rolled_back)
+        assert not AuditEntry.objects.exists()
+    
+    def test_entries_are_buffered_until_flushed(self, django_capture_on_commit_callbacks):
+        """Test that saving writes nothing to the audit table until a flush."""
+        with django_capture_on_commit_callbacks(execute=True):
+            for i in range(3):
+                Todo.objects.create(title=f"TODO {i}")
+        assert len(audit.buffer) == 3
+        assert not AuditEntry.objects.exists()
+        with CaptureQueriesContext(connection) as queries:
+            assert audit.buffer.flush() == 3
+        assert len(queries) == 1
+        assert audit.buffer.stats() == {'buffered': 0, 'flushed': 3, 'batches': 1, 'dropped': 0}
+    
+    def test_entries_are_append_only(self):
+        """Test that stored entries cannot be changed."""
+        entry = AuditEntry.objects.create(month=202401, todo_id=1, action=AuditEntry.UPDATE)
+        entry.actor = 'mallory'
+        with pytest.raises(ValueError):
+            entry.save()
+        with pytest.raises(ValueError):
+            AuditEntry.objects.update(actor='mallory')
+    
+    def test_history_and_prune_use_month_partitions(self):
+        """Test month-scoped history, pruning and the index they use."""
+        now = timezone.now()
+        current = audit.month_key(now)
+        old = audit._shift_month(current, -14)
+        AuditEntry.objects.create(month=current, todo_id=1, action=AuditEntry.UPDATE)
+        AuditEntry.objects.create(month=old, todo_id=1, action=AuditEntry.UPDATE)
+        assert audit.history(1).count() == 1
+        assert audit.history(1, months=15).count() == 2
+        
+        sql, params = audit.history(1).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        assert 'todos_audit_month_todo_idx (month=? AND todo_id=?)' in plan
+        
+        out = io.StringIO()
+        call_command('prune_audit', '--keep-months', '12', stdout=out)
+        assert 'Deleted 1 audit entries' in out.getvalue()
+        assert list(AuditEntry.objects.values_list('month', flat=True)) == [current]
+    
+    def test_month_arithmetic(self):
+        """Test month keys across year boundaries."""
+        assert audit._shift_month(202401, -1) == 202312
+        assert audit._shift_month(202412, 1) == 202501
+        assert audit._shift_month(202403, -14) == 202301
+    
+    def test_history_view_requires_staff(self, commit):
+        """Test the staff-only JSON history endpoint."""
+        todo = commit(Todo.objects.create, title="Watched")
+        client = Client()
+        assert client.get(reverse('todo-history', args=[todo.pk])).status_code == 302
+        User.objects.create_user('staff', password='pw', is_staff=True)
+        client.login(username='staff', password='pw')
+        data = client.get(reverse('todo-history', args=[todo.pk])).json()
+        assert [entry['action'] for entry in data['entries']] == [AuditEntry.CREATE]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAuditFlushThread:
+    """Test cases for the background flush thresholds."""
+
+    @pytest.fixture
+    def written(self, monkeypatch):
+        """Capture the background thread's writes instead of sharing the test database."""
+        batches = []
+        flushed = threading.Event()
+
+        def bulk_create(entries, batch_size=None):
+            batches.append(list(entries))
+            flushed.set()
+            return entries
+
+        monkeypatch.setattr(AuditEntry.objects, 'bulk_create', bulk_create)
+        return batches, flushed
+    
+    def test_size_threshold_flushes_in_background(self, settings, written):
+        """Test that a full buffer is written without an explicit flush."""
+        batches, flushed = written
+        settings.AUDIT_BUFFER_SIZE = 3
+        for i in range(3):
+            Todo.objects.create(title=f"TODO {i}")
+        assert flushed.wait(5)
+        assert [len(batch) for batch in batches] == [3]
+    
+    def test_time_threshold_flushes_in_background(self, settings, written):
+        """Test that a partly filled buffer is written after the interval."""
+        batches, flushed = written
+        settings.AUDIT_FLUSH_INTERVAL = 0.05
+        Todo.objects.create(title="Lonely")
+        assert flushed.wait(5)
+        assert [entry.action for entry in batches[0]] == [AuditEntry.CREATE]
+
+    def test_failed_flush_backs_off(self, settings, monkeypatch):
+        """Test that a full buffer whose write fails is retried once per interval."""
+        attempts = []
+
+        def bulk_create(entries, batch_size=None):
+            attempts.append(time.monotonic())
+            raise RuntimeError("database is locked")
+
+        monkeypatch.setattr(AuditEntry.objects, 'bulk_create', bulk_create)
+        settings.AUDIT_BUFFER_SIZE = 1
+        settings.AUDIT_FLUSH_INTERVAL = 0.2
+        Todo.objects.create(title="Stuck")
+        time.sleep(0.5)
+
+        assert 1 <= len(attempts) <= 3
+        # Leave nothing for the thread to retry once the stub is gone.
+        assert len(audit.buffer._take()) == 1
+
+
+# ========================
+# Daily Rollup Tests
+# ========================
+
+@pytest.mark.django_db
+class TestDailyRollups:
+    """Test cases for the incrementally maintained daily rollups."""
+    
+    @pytest.fixture
+    def travel(self, monkeypatch):
+        """Pretend that changes happen on a given local date."""
+        real = timezone.localdate
+
+        def to(day):
+            monkeypatch.setattr(timezone, 'localdate', lambda value=None: day if value is None else real(value))
+        return to
+    
+    def test_stocks_and_flows_over_days(self, travel):
+        """Test open and overdue counts carried across days with changes."""
+        d0 = date(2024, 3, 1)
+        travel(d0)
+        a = Todo.objects.create(title="A", due_date=d0 + timedelta(days=2))
+        b = Todo.objects.create(title="B")
+        c = Todo.objects.create(title="C", due_date=d0)
+        travel(d0 + timedelta(days=5))
+        a.is_resolved = True
+        a.save()
+        c.due_date = d0 + timedelta(days=10)
+        c.save()
+        travel(d0 + timedelta(days=6))
+        b.delete()
+        Todo.objects.filter(pk=a.pk).update(is_resolved=False)
+        
+        series = rollups.series(days=8, today=d0 + timedelta(days=7))
+        assert [day['day'] for day in series][:2] == [d0, d0 + timedelta(days=1)]
+        assert [day['open_count'] for day in series] == [3, 3, 3, 3, 3, 2, 2, 2]
+        assert [day['overdue_count'] for day in series] == [0, 1, 1, 2, 2, 0, 1, 1]
+        assert [day['created'] for day in series] == [3, 0, 0, 0, 0, 0, 0, 0]
+        assert series[5]['completed'] == 1
+        assert series[6]['deleted'] == series[6]['reopened'] == 1
+        
+        # A shorter window starts from the totals carried in.
+        assert rollups.series(days=2, today=d0 + timedelta(days=4))[0]['overdue_count'] == 2
+    
+    def test_incremental_matches_rebuild(self):
+        """Test that signal-maintained rows equal a backfill of the same TODOs."""
+        today = timezone.localdate()
+        todos = [
+            Todo.objects.create(title=f"TODO {i}", due_date=today - timedelta(days=i % 3) if i % 2 else None)
+            for i in range(12)
+        ]
+        todos[0].is_resolved = True
+        todos[0].save()
+        todos[1].due_date = today + timedelta(days=4)
+        todos[1].save()
+        Todo.objects.filter(pk__in=[todo.pk for todo in todos[5:9]]).update(is_resolved=True)
+        Client().post(reverse('todo-toggle', args=[todos[3].pk]))
+        incremental = rollups.series(days=3)
+        
+        out = io.StringIO()
+        call_command('rebuild_rollups', stdout=out)
+        assert 'Wrote' in out.getvalue()
+        assert rollups.series(days=3) == incremental
+        assert incremental[-1]['completed'] == 6
+        assert incremental[-1]['open_count'] == 6
+    
+    def test_bulk_update_objects_counts_once(self):
+        """Test that bulk_update() applies each row's transition once."""
+        todos = [Todo.objects.create(title=f"TODO {i}") for i in range(2)]
+        for todo in todos:
+            todo.is_resolved = True
+        Todo.objects.bulk_update(todos, ['is_resolved'])
+        
+        row = DailyRollup.objects.get(day=timezone.localdate())
+        assert (row.created, row.completed, row.open_delta) == (2, 2, 0)
+    
+    def test_year_series_is_one_indexed_query(self):
+        """Test that a 365-day series is one query over the day index."""
+        start = date(2020, 1, 1)
+        DailyRollup.objects.bulk_create(
+            DailyRollup(day=start + timedelta(days=i), created=1, open_delta=1) for i in range(2000)
+        )
+        today = start + timedelta(days=1999)
+        with CaptureQueriesContext(connection) as queries:
+            series = rollups.series(days=365, today=today)
+        assert len(queries) == 1
+        assert len(series) == 365
+        assert series[0]['open_count'] == 1636
+        assert series[-1]['open_count'] == 2000
+        
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + queries[0]['sql'])
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        assert 'USING INDEX' in plan and 'TEMP B-TREE' not in plan
+    
+    def test_report_views_require_staff(self):
+        """Test the staff-only report page and JSON endpoint."""
+        Todo.objects.create(title="Counted")
+        client = Client()
+        assert client.get(reverse('todo-report')).status_code == 302
+        User.objects.create_user('staff', password='pw', is_staff=True)
+        client.login(username='staff', password='pw')
+        response = client.get(reverse('todo-report'), {'days': '7'})
+        assert response.status_code == 200
+        assert response.context['totals']['created'] == 1
+        data = client.get(reverse('todo-rollups-json')).json()
+        assert len(data['days']) == 365
+        assert data['days'][-1]['open_count'] == 1
+
+
+# ========================
+# Static Asset Tests
+# ========================
+
+@pytest.mark.django_db
+class TestStaticAssets:
+    """Test cases for vendored, hashed and precompressed static files."""
+    
+    @pytest.fixture
+    def collected(self, settings, tmp_path):
+        """Run collectstatic into a temporary STATIC_ROOT."""
+        settings.STATIC_ROOT = tmp_path
+        call_command('collectstatic', interactive=False, verbosity=0)
+        return tmp_path
+    
+    def test_pages_load_nothing_inline_or_from_a_cdn(self):
+        """Test that pages reference local stylesheets and scripts only."""
+        Todo.objects.create(title="Styled", description="Described")
+        content = Client().get(reverse('todo-list')).content.decode()
+        assert 'cdn.jsdelivr.net' not in content
+        assert '<style' not in content and 'style="' not in content
+        assert '<script>' not in content
+        # Without a manifest the storage falls back to the plain names.
+        assert '/static/todos/css/app.css' in content
+        assert '/static/todos/vendor/bootstrap/bootstrap.min.css' in content
+    
+    def test_collected_files_are_hashed_and_compressed(self, collected):
+        """Test hashed names in pages and the variants written beside them."""
+        url = staticfiles_storage.url('todos/css/app.css')
+        assert url != '/static/todos/css/app.css' and url.endswith('.css')
+        assert url in Client().get(reverse('todo-list')).content.decode()
+        
+        original = (collected / url[len('/static/'):]).read_bytes()
+        compressed = collected / (url[len('/static/'):] + '.gz')
+        assert gzip.decompress(compressed.read_bytes()) == original
+        assert len(compressed.read_bytes()) < len(original)
+    
+    def test_hashed_files_are_served_immutable_and_compressed(self, collected):
+        """Test cache headers and encoding negotiation of served files."""
+        url = staticfiles_storage.url('todos/js/home.js')
+        client = Client()
+        
+        response = client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        assert response.status_code == 200
+        assert response['Content-Encoding'] == 'gzip'
+        assert response['Content-Type'].startswith('text/javascript')
+        assert response['Cache-Control'] == f'public, max-age={365 * 24 * 60 * 60}, immutable'
+        assert 'Accept-Encoding' in response['Vary']
+        body = gzip.decompress(b''.join(response.streaming_content))
+        assert b'getCSRFToken' in body
+        
+        plain = client.get(url)
+        assert 'Content-Encoding' not in plain
+        assert b''.join(plain.streaming_content) == body
+        
+        unhashed = client.get('/static/todos/js/home.js')
+        assert unhashed['Cache-Control'] == 'no-cache'
+        revalidated = client.get(
+            '/static/todos/js/home.js', HTTP_IF_MODIFIED_SINCE=unhashed['Last-Modified'],
+        )
+        assert revalidated.status_code == 304
+        
+        assert client.get('/static/../manage.py').status_code == 404
+        assert client.get('/static/todos/missing.css').status_code == 404
+    
+    def test_base_template_static_paths_resolve(self):
+        """Test that every file base.html loads is found by the static finders."""
+        source = get_template('todos/base.html').template.source
+        paths = re.findall(r"""{% static '([^']+)' %}""", source)
+        assert 'todos/vendor/bootstrap/bootstrap.min.css' in paths
+        assert 'todos/vendor/bootstrap/bootstrap.bundle.min.js' in paths
+        assert [path for path in paths if finders.find(path) is None] == []
+    
+    def test_vendored_files_match_pinned_hashes(self):
+        """Test that vendored files are unmodified copies of the pinned releases."""
+        for name, (url, expected) in assets.VENDORED.items():
+            assert assets.integrity(Path(finders.find(name)).read_bytes()) == expected, url
+    
+    def test_integrity_hash(self):
+        """Test the Subresource Integrity format used to pin vendored files."""
+        assert assets.integrity(b'') == (
+            'sha384-OLBgp1GsljhM2TJ+sbHjaiH9txEUvgdDTAzHv2P24donTt6/529l+9Ua0vFImLlb'
+        )
+
+
+# ========================
+# Rate Limiting Tests
+# ========================
+
+@pytest.mark.django_db
+class TestRateLimiting:
+    """Test cases for write token buckets and concurrency shedding."""
+    
+    def test_token_bucket_refills_over_time(self):
+        """Test burst, refusal with a wait and refill at the configured rate."""
+        bucket = [('ratelimit:test', 2, 0.5)]
+        assert ratelimit.take(bucket, now=100.0) == [0]
+        assert ratelimit.take(bucket, now=100.0) == [0]
+        assert ratelimit.take(bucket, now=100.0) == [2.0]
+        assert ratelimit.take(bucket, now=101.0) == [1.0]
+        assert ratelimit.take(bucket, now=102.0) == [0]
+    
+    def test_buckets_are_taken_all_or_nothing(self):
+        """Test that an empty bucket leaves the others untouched."""
+        full, empty = ('ratelimit:full', 5, 1.0), ('ratelimit:empty', 1, 0.1)
+        assert ratelimit.take([empty], now=0.0) == [0]
+        assert ratelimit.take([full, empty], now=0.0) == [0, 10.0]
+        assert ratelimit.take([full] * 5, now=0.0) == [0] * 5
+    
+    def test_toggle_is_throttled_per_object_and_per_client(self, settings):
+        """Test 429 responses with Retry-After and the counters behind them."""
+        settings.RATE_LIMITS = {'todo-toggle': {'client': (3, 0.01), 'object': (2, 0.01)}}
+        first = Todo.objects.create(title="Hammered")
+        second = Todo.objects.create(title="Next")
+        client = Client()
+        statuses = [client.post(reverse('todo-toggle', args=[first.pk])).status_code for _ in range(3)]
+        assert statuses == [200, 200, 429]
+        response = client.post(reverse('todo-toggle', args=[first.pk]))
+        assert response['Retry-After'] == '100'
+        assert response.json()['success'] is False
+        
+        # The client bucket still has one token, spent on another TODO.
+        assert client.post(reverse('todo-toggle', args=[second.pk])).status_code == 200
+        assert client.post(reverse('todo-toggle', args=[second.pk])).status_code == 429
+        # Other clients share the per-object bucket but not the per-client one.
+        other = Client(REMOTE_ADDR='10.0.0.2')
+        assert other.post(reverse('todo-toggle', args=[first.pk])).status_code == 429
+        assert other.post(reverse('todo-toggle', args=[second.pk])).status_code == 200
+        assert client.get(reverse('todo-list')).status_code == 200
+        
+        assert ratelimit.rate_limit_stats()['throttled'] == {
+            'todo-toggle:object': 3, 'todo-toggle:client': 1,
+        }
+    
+    def test_writes_beyond_the_concurrency_cap_are_shed(self, settings):
+        """Test that a write arriving while the slots are taken gets a fast 503."""
+        settings.RATE_LIMIT_MAX_CONCURRENT_WRITES = 1
+        entered, release = threading.Event(), threading.Event()
+        
+        def slow_view(request):
+            entered.set()
+            release.wait(5)
+            return JsonResponse({'success': True})
+        
+        middleware = ratelimit.RateLimitMiddleware(slow_view)
+        factory = RequestFactory()
+        
+        def call():
+            request = factory.post('/todos/1/toggle/')
+            request.resolver_match = resolve('/todos/1/toggle/')
+            refused = middleware.process_view(request, slow_view, (), {'pk': 1})
+            return refused or middleware(request)
+        
+        worker = threading.Thread(target=call)
+        worker.start()
+        assert entered.wait(5)
+        try:
+            shed = call()
+        finally:
+            release.set()
+            worker.join()
+        assert shed.status_code == 503
+        assert shed['Retry-After'] == '1'
+        assert call().status_code == 200
+        stats = ratelimit.rate_limit_stats()
+        assert stats['shed'] == 1
+        assert stats['in_flight_writes'] == 0
+        assert stats['peak_in_flight_writes'] == 1
+    
+    def test_metrics_include_rate_limit_counters(self):
+        """Test that the metrics view reports throttling counters."""
+        User.objects.create_user('staff', password='pw', is_staff=True)
+        client = Client()
+        client.login(username='staff', password='pw')
+        data = client.get(reverse('todo-metrics')).json()
+        assert data['rate_limit']['throttled_total'] == 0
+        assert data['rate_limit']['max_concurrent_writes'] == 8
@@ -0,0 +1,157 @@
+"""
+Closure-table maintenance and queries for nested TODOs.
+
+``TodoClosure`` holds one row per (ancestor, descendant) pair with the
+distance between them; a TODO's link to itself is implied rather than
+stored, so top-level TODOs cost nothing extra. Subtree fetches, open
+descendant counts and resolution roll-ups are each a single query against
+the ``(ancestor, descendant)`` unique index or the ``descendant`` FK index.
+"""
+
+from django.db.models import Exists, OuterRef, Subquery, prefetch_related_objects
+from django.utils import timezone
+
+from .models import Todo, TodoClosure
+
+
+def attach(todo):
+    """Add closure rows for a newly created TODO under ``todo.parent_id``."""
+    if todo.parent_id is None:
+        return
+    links = [TodoClosure(ancestor_id=todo.parent_id, descendant_id=todo.pk, depth=1)]
+    links += [
+        TodoClosure(ancestor_id=ancestor_id, descendant_id=todo.pk, depth=depth + 1)
+        for ancestor_id, depth in TodoClosure.objects.filter(
+            descendant_id=todo.parent_id,
+        ).values_list('ancestor_id', 'depth')
+    ]
+    TodoClosure.objects.bulk_create(links)
+
+
+def move(todo):
+    """Re-link ``todo`` and its subtree after its parent changed."""
+    subtree = [(todo.pk, 0)] + list(
+        TodoClosure.objects.filter(ancestor_id=todo.pk).values_list('descendant_id', 'depth')
+    )
+    subtree_ids = [pk for pk, _ in subtree]
+    TodoClosure.objects.filter(descendant_id__in=subtree_ids).exclude(
+        ancestor_id__in=subtree_ids,
+    ).delete()
+    if todo.parent_id is None:
+        return
+    ancestors = [(todo.parent_id, 0)] + list(
+        TodoClosure.objects.filter(descendant_id=todo.parent_id).values_list('ancestor_id', 'depth')
+    )
+    TodoClosure.objects.bulk_create(
+        TodoClosure(
+            ancestor_id=ancestor_id,
+            descendant_id=descendant_id,
+            depth=ancestor_depth + 1 + descendant_depth,
+        )
+        for ancestor_id, ancestor_depth in ancestors
+        for descendant_id, descendant_depth in subtree
+    )
+
+
+def ancestor_ids(todo):
+    return TodoClosure.objects.filter(descendant_id=todo.pk).values('ancestor_id')
+
+
+def descendants(todo):
+    """All TODOs below ``todo``, in one query."""
+    return Todo.objects.filter(ancestor_links__ancestor_id=todo.pk)
+
+
+def open_descendant_count(todo):
+    """Number of unresolved TODOs below ``todo``, in one query."""
+    return TodoClosure.objects.filter(ancestor_id=todo.pk, descendant__is_resolved=False).count()
+
+
+def is_descendant(todo, candidate_id):
+    """Whether ``candidate_id`` lies in the subtree below ``todo``."""
+    return TodoClosure.objects.filter(ancestor_id=todo.pk, descendant_id=candidate_id).exists()
+
+
+def _open_leaf_below():
+    # An unresolved descendant without children of its own. Roll-ups only
+    # look at leaves so ancestors updated in the same statement cannot
+    # affect each other's outcome.
+    return Exists(
+        TodoClosure.objects.filter(
+            ancestor_id=OuterRef('pk'),
+            descendant__is_resolved=False,
+        ).exclude(
+            Exists(Todo.objects.filter(parent_id=OuterRef('descendant_id'))),
+        )
+    )
+
+
+def roll_up(ancestors, resolved):
+    """
+    Propagate a resolution change to ``ancestors`` (a pk subquery or list).
+
+    Resolving a subtask resolves every ancestor that still has subtasks but
+    no open leaf among them; reopening one (or adding an open one) reopens
+    every resolved ancestor. Each direction is a single UPDATE.
+    """
+    queryset = Todo.objects.filter(pk__in=ancestors)
+    if resolved:
+        # An ancestor whose last subtask was deleted or moved away is not done.
+        queryset = queryset.filter(
+            Exists(TodoClosure.objects.filter(ancestor_id=OuterRef('pk'))),
+            is_resolved=False,
+        ).exclude(_open_leaf_below())
+    else:
+        queryset = queryset.filter(is_resolved=True).filter(_open_leaf_below())
+    return queryset.update(is_resolved=resolved, updated_at=timezone.now())
+
+
+def roll_up_from(todo, resolved=None):
+    """Roll ``todo``'s resolution status up to its ancestors."""
+    if todo.parent_id is None:
+        return 0
+    if resolved is None:
+        resolved = todo.is_resolved
+    return roll_up(Subquery(ancestor_ids(todo)), resolved)
+
+
+def attach_subtasks(todos, prefetch=()):
+    """
+    Prefetch the full subtree of each TODO in ``todos`` with one query.
+
+    Sets ``subtasks`` (direct children, nested the same way) and
+    ``open_subtask_count`` (all unresolved descendants) on every node.
+    ``prefetch`` lookups are applied to all descendants at once.
+    """
+    roots = list(todos)
+    links = (
+        TodoClosure.objects.filter(ancestor_id__in=[todo.pk for todo in roots])
+        .select_related('descendant')
+        .order_by('depth', '-descendant__created_at')
+    )
+    descendants_by_root = {}
+    for link in links:
+        descendants_by_root.setdefault(link.ancestor_id, []).append(link.descendant)
+    if prefetch and descendants_by_root:
+        prefetch_related_objects(
+            [node for subtree in descendants_by_root.values() for node in subtree],
+            *prefetch,
+        )
+    for root in roots:
+        # Per-root lookup: a filtered page may list a TODO and its ancestor.
+        nodes = {root.pk: root}
+        subtree = descendants_by_root.get(root.pk, ())
+        for node in (root, *subtree):
+            node.subtasks = []
+            node.open_subtask_count = 0
+            nodes[node.pk] = node
+        for node in subtree:
+            nodes[node.parent_id].subtasks.append(node)
+            if not node.is_resolved:
+                ancestor = nodes[node.parent_id]
+                while True:
+                    ancestor.open_subtask_count += 1
+                    if ancestor is root:
+                        break
+                    ancestor = nodes[ancestor.parent_id]
+    return roots
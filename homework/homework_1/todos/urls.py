@@ -7,4 +7,11 @@ urlpatterns = [
     path('<int:pk>/edit/', views.TodoUpdateView.as_view(), name='todo-edit'),
     path('<int:pk>/delete/', views.TodoDeleteView.as_view(), name='todo-delete'),
     path('<int:pk>/toggle/', views.toggle_todo_status, name='todo-toggle'),
+    path('<int:pk>/history/', views.todo_history, name='todo-history'),
+    path('report/', views.todo_report, name='todo-report'),
+    path('api/todos/', views.todo_list_json, name='todo-list-json'),
+    path('api/rollups/', views.rollups_json, name='todo-rollups-json'),
+    path('metrics/', views.metrics, name='todo-metrics'),
+    path('profiling/', views.profiling_index, name='profiling-index'),
+    path('profiling/<str:url_name>/', views.profiling_dump, name='profiling-dump'),
 ]
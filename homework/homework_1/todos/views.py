@@ -1,13 +1,37 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_POST
 from django.utils.decorators import method_decorator
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 
-from .models import Todo
+from . import audit, rollups
+from .cache import cache_stats
+from .models import Tag, Todo
+from .filtering import SORT_CHOICES, filter_todos, parse_params
 from .forms import TodoForm
+from .profiling import store as profile_store
+from .ratelimit import rate_limit_stats
+from .serializers import iter_json
+from .taskqueue import queue_stats
+from .tasks import materialize_recurrences_soon
+from .tagging import MATCH_ANY, filter_by_tags
+from .tree import attach_subtasks
+
+
+def get_todo_or_404(pk, fresh=False):
+    """
+    Fetch a TODO through the object cache, raising Http404 if missing.
+
+    Pass ``fresh=True`` before writing: the cache is process-local, so a row
+    changed by another process may be stale in it.
+    """
+    try:
+        return Todo.objects.get(pk=pk) if fresh else Todo.cached.get(pk)
+    except Todo.DoesNotExist:
+        raise Http404(f"No TODO found with id {pk}")
 
 
 class TodoListView(ListView):
@@ -16,9 +40,45 @@ class TodoListView(ListView):
     template_name = 'todos/home.html'
     context_object_name = 'todos'
     paginate_by = 10
+    max_paginate_by = 100
+
+    def get_paginate_by(self, queryset):
+        per_page = self.request.GET.get('per_page', '')
+        if per_page.isdigit():
+            return min(max(int(per_page), 1), self.max_paginate_by)
+        return self.paginate_by
+
+    def get(self, request, *args, **kwargs):
+        self.filters = parse_params(request.GET)
+        # Store occurrences of recurring TODOs that entered the window; the
+        # page shows their dates from the rule until then.
+        materialize_recurrences_soon()
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        queryset = Todo.objects.select_related('recurrence_rule').prefetch_related('tags')
+        slugs = self.request.GET.getlist('tag')
+        if slugs:
+            # Filtered listings search every TODO, subtasks included.
+            queryset = filter_by_tags(queryset, slugs, self.request.GET.get('match', MATCH_ANY))
+        else:
+            # Otherwise subtasks are rendered nested under their top-level TODO.
+            queryset = queryset.filter(parent__isnull=True)
+        return filter_todos(queryset, **self.filters)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['todos'] = context['object_list'] = attach_subtasks(
+            context['object_list'], prefetch=['tags', 'recurrence_rule'],
+        )
+        query = self.request.GET.copy()
+        query.pop('page', None)
+        context['page_query'] = query.urlencode()
+        context['tags'] = Tag.objects.all()
+        context['selected_tags'] = self.request.GET.getlist('tag')
+        context['tag_match'] = self.request.GET.get('match', MATCH_ANY)
+        context['filters'] = self.filters
+        context['sort_choices'] = SORT_CHOICES
         context['total_count'] = Todo.objects.count()
         context['completed_count'] = Todo.objects.filter(is_resolved=True).count()
         context['pending_count'] = Todo.objects.filter(is_resolved=False).count()
@@ -32,6 +92,12 @@ class TodoCreateView(CreateView):
     template_name = 'todos/todo_form.html'
     success_url = reverse_lazy('todo-list')
 
+    def get_initial(self):
+        initial = super().get_initial()
+        if self.request.GET.get('parent', '').isdigit():
+            initial['parent'] = self.request.GET['parent']
+        return initial
+
     def form_valid(self, form):
         response = super().form_valid(form)
         messages.success(self.request, f"TODO '{self.object.title}' created successfully!")
@@ -45,6 +111,9 @@ class TodoUpdateView(UpdateView):
     template_name = 'todos/todo_form.html'
     success_url = reverse_lazy('todo-list')
 
+    def get_object(self, queryset=None):
+        return get_todo_or_404(self.kwargs['pk'], fresh=self.request.method == 'POST')
+
     def form_valid(self, form):
         response = super().form_valid(form)
         messages.success(self.request, f"TODO '{self.object.title}' updated successfully!")
@@ -57,6 +126,9 @@ class TodoDeleteView(DeleteView):
     template_name = 'todos/todo_confirm_delete.html'
     success_url = reverse_lazy('todo-list')
 
+    def get_object(self, queryset=None):
+        return get_todo_or_404(self.kwargs['pk'], fresh=self.request.method == 'POST')
+
     def delete(self, request, *args, **kwargs):
         todo_title = self.get_object().title
         response = super().delete(request, *args, **kwargs)
@@ -67,12 +139,111 @@ class TodoDeleteView(DeleteView):
 @require_POST
 def toggle_todo_status(request, pk):
     """Toggle the resolved status of a TODO (AJAX endpoint)."""
-    todo = get_object_or_404(Todo, pk=pk)
+    todo = get_todo_or_404(pk, fresh=True)
     todo.is_resolved = not todo.is_resolved
-    todo.save()
+    # Only the toggled column, so a concurrent edit of the others is kept.
+    todo.save(update_fields=['is_resolved', 'updated_at'])
     
     return JsonResponse({
         'success': True,
         'is_resolved': todo.is_resolved,
         'message': f"TODO marked as {'completed' if todo.is_resolved else 'pending'}"
     })
+
+
+def todo_list_json(request):
+    """Stream all TODOs as a JSON array without instantiating models."""
+    return StreamingHttpResponse(iter_json(), content_type='application/json')
+
+
+@staff_member_required
+def profiling_index(request):
+    """Summarise the requests profiled so far, per URL name."""
+    return JsonResponse(profile_store.summary())
+
+
+@staff_member_required
+def profiling_dump(request, url_name):
+    """Download aggregated profiling data for one URL name."""
+    if url_name not in profile_store.url_names():
+        raise Http404(f"No profiles recorded for '{url_name}'")
+    output = request.GET.get('format', 'collapsed')
+    filename = url_name.replace(':', '-')
+    if output == 'pstats':
+        response = HttpResponse(
+            profile_store.pstats_dump(url_name),
+            content_type='application/octet-stream',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}.pstats"'
+    elif output == 'allocations':
+        response = JsonResponse({
+            'url_name': url_name,
+            'top_allocations': [
+                {'site': site, 'bytes': size}
+                for site, size in profile_store.top_allocations(url_name)
+            ],
+        })
+    elif output == 'collapsed':
+        response = HttpResponse(
+            profile_store.collapsed_stacks(url_name),
+            content_type='text/plain; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}.collapsed.txt"'
+    else:
+        response = JsonResponse({'error': f"Unknown format '{output}'"}, status=400)
+    return response
+
+
+@staff_member_required
+def metrics(request):
+    """Expose in-process performance counters as JSON."""
+    return JsonResponse({
+        'todo_cache': cache_stats(),
+        'task_queue': queue_stats(),
+        'audit': audit.buffer.stats(),
+        'rate_limit': rate_limit_stats(),
+    })
+
+
+@staff_member_required
+def todo_history(request, pk):
+    """Audit entries for one TODO, newest first (``?months=`` back, default 12)."""
+    months = request.GET.get('months', '')
+    months = min(int(months), 120) if months.isdigit() and int(months) > 0 else 12
+    return JsonResponse({
+        'todo_id': pk,
+        'entries': [
+            {
+                'action': entry.action,
+                'changes': entry.changes,
+                'actor': entry.actor or None,
+                'source': entry.source,
+                'at': entry.created_at,
+            }
+            for entry in audit.history(pk, months)
+        ],
+    })
+
+
+def _report_days(request, default):
+    days = request.GET.get('days', '')
+    return min(int(days), 3650) if days.isdigit() and int(days) > 0 else default
+
+
+@staff_member_required
+def todo_report(request):
+    """Created, completed and overdue TODOs per day (``?days=``, default 30)."""
+    series = rollups.series(_report_days(request, 30))
+    totals = {counter: sum(day[counter] for day in series) for counter in rollups.COUNTERS}
+    return render(request, 'todos/report.html', {
+        'series': series[::-1],
+        'totals': totals,
+        'current': series[-1],
+        'days': len(series),
+    })
+
+
+@staff_member_required
+def rollups_json(request):
+    """The daily rollup series as JSON (``?days=``, default 365)."""
+    return JsonResponse({'days': rollups.series(_report_days(request, 365))})